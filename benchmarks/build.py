@@ -0,0 +1,259 @@
+"""Measure how `geno build` scales on synthetic sites.
+
+Every combination of the requested page counts, page sizes, template depths
+and Pyodide ratios is generated as a fresh project and built three times:
+
+  cold     from an empty static/ and .geno/
+  warm     again with nothing changed
+  touched  after editing the body of a single post
+
+Builds run in their own process with `--profile`, so page latencies and peak
+resident memory come from the build trace. Nothing is downloaded, so the
+benchmark runs offline.
+
+    uv run python benchmarks/build.py --pages 10 1000 10000 --jobs 0
+    uv run python benchmarks/build.py --save main
+    uv run python benchmarks/build.py --compare main
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import pathlib
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINES = pathlib.Path(__file__).parent / "baselines"
+
+CONFIGURATION = """\
+title: Benchmark
+logo: assets/images/logo.png
+favicon: assets/images/favicon.ico
+header_color: "#FFFFFF"
+header_background: "#009926"
+navigation:
+  main:
+    Home: index.md
+    Blog: blog.md
+button:
+  button_type: success
+  button_style: outline
+  width: 120
+"""
+
+INDEX = """\
+title: Home
+---fm---
+
+## Latest Post
+
+- ### [{{ site.pages.blog[0].date }} {{ site.pages.blog[0].title }}]( {{ site.pages.blog[0].link }})
+"""
+
+BLOG = """\
+title: Blog
+---fm---
+
+## Latest Posts
+
+{% for page in site.pages.blog %}
+- ### [{{ page.date }} {{ page.title }}]( {{ page.link }})
+{% endfor %}
+"""
+
+APP = """\
+import panel as pn
+
+pn.extension()
+
+pn.pane.Markdown({body!r}).servable()
+"""
+
+WORDS = (
+    "geno panel bokeh pyodide markdown template static site page build cache "
+    "render python wasm layout asset frontmatter section archive benchmark"
+).split()
+
+TAGS = ["python", "c++", "panel", "wasm", "performance", "visualization"]
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 80))) + "."
+
+
+def _body(rng: random.Random, size: int) -> str:
+    """Roughly ``size`` bytes of Markdown."""
+    parts = []
+    while sum(map(len, parts)) < size:
+        if len(parts) % 5 == 0:
+            parts.append(f"## {rng.choice(WORDS).title()} {len(parts)}")
+        parts.append(_paragraph(rng))
+    return "\n\n".join(parts)
+
+
+def generate(
+    root: pathlib.Path, pages: int, size: int, depth: int, pyodide: float
+) -> None:
+    """Write a project with ``pages`` posts under ``root``."""
+    rng = random.Random(pages * 31 + size * 7 + depth)
+    (root / "assets" / "css").mkdir(parents=True)
+    (root / "assets" / "images").mkdir()
+    (root / "assets" / "images" / "favicon.ico").write_bytes(b"\0" * 64)
+    (root / "assets" / "css" / "site.css").write_text("h1 { color: #159957; }\n")
+    (root / "geno.yml").write_text(CONFIGURATION)
+
+    # Layouts extend each other, so every post renders through the full chain.
+    templates = root / "templates"
+    templates.mkdir()
+    (templates / "default").write_text("# {{ page.title }}\n\n{{ content }}\n")
+    (templates / "layout-0").write_text(
+        "# {{ page.title }}\n\n{% block body %}{{ content }}{% endblock %}\n"
+    )
+    for level in range(1, depth + 1):
+        (templates / f"layout-{level}").write_text(
+            f'{{% extends "layout-{level - 1}" %}}\n'
+            f"{{% block body %}}### Level {level}\n\n{{{{ super() }}}}{{% endblock %}}\n"
+        )
+
+    content = root / "content"
+    (content / "blog").mkdir(parents=True)
+    (content / "index.md").write_text(INDEX)
+    (content / "blog.md").write_text(BLOG)
+    start = datetime.date(2020, 1, 1)
+    apps = round(pages * pyodide)
+    for number in range(pages):
+        frontmatter = (
+            f"title: Post {number}\n"
+            f"layout: layout-{depth}\n"
+            f"date: {start + datetime.timedelta(days=number)}\n"
+            f"tags: {' '.join(rng.sample(TAGS, 2))}\n"
+            f"section: {rng.choice(['blog', 'notes', 'projects'])}\n"
+            "---fm---\n\n"
+        )
+        body = _body(rng, size)
+        if number < apps:
+            page = content / "blog" / f"post-{number:05}.py"
+            page.write_text(frontmatter + APP.format(body=body))
+        else:
+            page = content / "blog" / f"post-{number:05}.md"
+            page.write_text(frontmatter + body + "\n")
+
+
+def _percentile(values: list[float], percentile: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+def build(root: pathlib.Path, jobs: int) -> dict:
+    trace = root / ".geno" / "benchmark.json"
+    command = [
+        sys.executable,
+        "-c",
+        "import sys; from geno.cli import main; sys.argv[0] = 'geno'; main()",
+        "build",
+        "geno.yml",
+        f"--jobs={jobs}",
+        f"--profile={trace}",
+    ]
+    start = time.perf_counter()
+    subprocess.run(command, cwd=root, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+
+    events = json.loads(trace.read_text())["traceEvents"]
+    # Pyodide pages have one span for their template and one for conversion.
+    pages = {}
+    for event in events:
+        if event["cat"] == "page":
+            src = event["args"]["src"]
+            pages[src] = pages.get(src, 0) + event["dur"] / 1e6
+    latencies = list(pages.values())
+    return {
+        "wall": wall,
+        "pages": len(latencies),
+        "throughput": len(latencies) / wall,
+        "p50": _percentile(latencies, 50),
+        "p90": _percentile(latencies, 90),
+        "p99": _percentile(latencies, 99),
+        "peak_rss": max(event["args"]["peak_memory"] for event in events),
+    }
+
+
+def scenario(pages: int, size: int, depth: int, pyodide: float, jobs: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="geno-benchmark-") as tmp:
+        root = pathlib.Path(tmp)
+        generate(root, pages, size, depth, pyodide)
+        results = {"cold": build(root, jobs), "warm": build(root, jobs)}
+        post = sorted((root / "content" / "blog").glob("*.md"))[-1]
+        with open(post, "a") as f:
+            f.write("\nEdited.\n")
+        results["touched"] = build(root, jobs)
+    return results
+
+
+def _key(pages: int, size: int, depth: int, pyodide: float, jobs: int) -> str:
+    return f"pages={pages} size={size} depth={depth} pyodide={pyodide} jobs={jobs}"
+
+
+def _format(run: str, result: dict, baseline: dict | None) -> str:
+    line = (
+        f"  {run:<8} {result['wall']:8.2f}s {result['pages']:6} pages "
+        f"{result['throughput']:8.1f}/s  p50 {result['p50']:6.3f}s "
+        f"p90 {result['p90']:6.3f}s p99 {result['p99']:6.3f}s "
+        f"{result['peak_rss'] / 2**20:8.1f} MB"
+    )
+    if baseline is not None:
+        change = result["wall"] / baseline["wall"] - 1 if baseline["wall"] else 0
+        line += f"  {change:+7.1%} vs baseline"
+    return line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument(
+        "--size", type=int, nargs="+", default=[4096], help="bytes of Markdown"
+    )
+    parser.add_argument(
+        "--depth", type=int, nargs="+", default=[1], help="layouts in each chain"
+    )
+    parser.add_argument(
+        "--pyodide",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        help="fraction of posts that are Pyodide apps",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--save", metavar="NAME", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        baseline = json.loads((BASELINES / f"{args.compare}.json").read_text())
+
+    results = {}
+    for pages, size, depth, pyodide in itertools.product(
+        args.pages, args.size, args.depth, args.pyodide
+    ):
+        key = _key(pages, size, depth, pyodide, args.jobs)
+        print(key, flush=True)
+        results[key] = scenario(pages, size, depth, pyodide, args.jobs)
+        for run, result in results[key].items():
+            print(_format(run, result, baseline.get(key, {}).get(run)), flush=True)
+
+    if args.save:
+        BASELINES.mkdir(exist_ok=True)
+        path = BASELINES / f"{args.save}.json"
+        path.write_text(json.dumps(results, indent=1, sort_keys=True))
+        print(f"Saved baseline to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Check that `geno` starts without importing the rendering stack.
+
+Panel and Bokeh take seconds to import, so commands that do not render
+anything, and the generator itself until it renders a page, must not import
+them. Every probe runs in a fresh interpreter, fails when it imports one of
+the heavy modules below and reports its best wall time out of a few runs:
+
+    uv run python benchmarks/startup.py
+    uv run python benchmarks/startup.py --budget 0.3
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+HEAVY = ["bokeh", "flask", "markdown", "markdown_it", "panel", "pygments"]
+
+PROBES = {
+    "geno --help": "from geno.cli import main; sys.argv = ['geno', '--help']; main()",
+    "geno version": "from geno.cli import main; sys.argv = ['geno', 'version']; main()",
+    "geno build --help": (
+        "from geno.cli import main; sys.argv = ['geno', 'build', '--help']; main()"
+    ),
+    "import geno.generator": "import geno.generator",
+    "import geno.pages": "import geno.pages",
+}
+
+# Runs a probe and reports which heavy modules it imported on the last line.
+WRAPPER = """\
+import json, sys
+try:
+    {code}
+except SystemExit:
+    pass
+print(json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)))
+"""
+
+
+def probe(code: str) -> tuple[float, list[str]]:
+    command = [sys.executable, "-c", WRAPPER.format(code=code, heavy=HEAVY)]
+    start = time.perf_counter()
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    return wall, json.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--budget", type=float, default=1.0, help="seconds allowed for every probe"
+    )
+    args = parser.parse_args()
+
+    failures = 0
+    for name, code in PROBES.items():
+        results = [probe(code) for _ in range(args.runs)]
+        wall = min(wall for wall, _ in results)
+        imported = results[-1][1]
+        problems = []
+        if imported:
+            problems.append(f"imports {', '.join(imported)}")
+        if wall > args.budget:
+            problems.append(f"over the {args.budget:.2f}s budget")
+        failures += bool(problems)
+        print(f"  {name:<24} {wall:6.3f}s  {'; '.join(problems) or 'ok'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
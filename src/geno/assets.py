@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+
+from . import dependencies
+from .manifest import load_state, save_state
+
+
+def file_digest(path: pathlib.Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def fingerprinted(path: str, digest: str) -> str:
+    stem, dot, suffix = path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{path}.{digest[:8]}"
+    return f"{stem}.{digest[:8]}.{suffix}"
+
+
+def write_once(dst: pathlib.Path, data: bytes) -> None:
+    """Write a content addressed file unless it already exists.
+
+    Processes may write the same file at once, hence the rename.
+    """
+    if dst.exists():
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dst)
+
+
+def _up_to_date(stat: os.stat_result, dst: pathlib.Path) -> bool:
+    try:
+        current = dst.stat()
+    except FileNotFoundError:
+        return False
+    return current.st_size == stat.st_size and current.st_mtime_ns == stat.st_mtime_ns
+
+
+class Assets:
+    """Keeps static/ in sync with assets/ and maps asset paths to published URLs.
+
+    Files are only copied when their size or modification time differs from the
+    published copy. With ``fingerprint`` every file is also published under a
+    name containing its content hash, so it can be cached indefinitely.
+    """
+
+    def __init__(
+        self, state_path: pathlib.Path, fingerprint: bool = False, link: bool = False
+    ) -> None:
+        self.state_path = state_path
+        self.fingerprint = fingerprint
+        self.link = link
+        self.urls = {}
+        # Responsive variants of images, see images.ImageVariants.
+        self.variants = {}
+        self.copied = 0
+        self.state = load_state(state_path, {"files": {}, "outputs": []})
+
+    def copy(self, src: pathlib.Path, dst: pathlib.Path) -> bool:
+        stat = src.stat()
+        if _up_to_date(stat, dst):
+            return False
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.unlink(missing_ok=True)
+        if self.link:
+            try:
+                os.link(src, dst)
+                return True
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        return True
+
+    def sync(self, src_dir: pathlib.Path, static: pathlib.Path):
+        """Publish ``src_dir`` and return the outputs of files that went away."""
+        files = {}
+        outputs = []
+        for src in sorted(path for path in src_dir.rglob("*") if path.is_file()):
+            path = src.as_posix()
+            stat = src.stat()
+            previous = self.state["files"].get(path)
+            if previous and previous[:2] == [stat.st_size, stat.st_mtime_ns]:
+                digest = previous[2]
+            else:
+                digest = file_digest(src)
+            files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+
+            self.urls[path] = path
+            targets = [static / path]
+            if self.fingerprint:
+                self.urls[path] = fingerprinted(path, digest)
+                targets.append(static / self.urls[path])
+            for target in targets:
+                self.copied += self.copy(src, target)
+                outputs.append(str(target))
+
+        removed = set(self.state["outputs"]) - set(outputs)
+        self.state = {"files": files, "outputs": outputs}
+        save_state(self.state_path, self.state)
+        return [pathlib.Path(output) for output in sorted(removed)]
+
+    def write_manifest(self, path: pathlib.Path) -> None:
+        manifest = json.dumps(self.urls, indent=1, sort_keys=True)
+        if not path.exists() or path.read_text() != manifest:
+            path.write_text(manifest)
+
+    def url(self, path: str) -> str:
+        """Template helper resolving ``assets/...`` to its published URL."""
+        dependencies.record(f"asset:{path}")
+        root = "/" if path.startswith("/") else ""
+        path = path.lstrip("/")
+        return root + self.urls.get(path, path)
@@ -0,0 +1,155 @@
+import importlib.metadata
+import json
+import os
+import pathlib
+import re
+import shutil
+
+from .manifest import digest, load_state, save_state
+
+# The install line of a worker as Panel writes it, or as rewritten below,
+# which keeps the requirements of the page next to the bundle it installs.
+_INSTALL = re.compile(
+    r"^([ \t]*)(?:await micropip\.install\((\[.*\])\)|"
+    r'from pyodide\.http import pyfetch; _geno_bundle = "[^"]*"; '
+    r"_geno_requirements = (\[.*\])\n[ \t]*await micropip\.install\(.*\));?[ \t]*$",
+    re.M,
+)
+_REQUIREMENT = re.compile(r"""["']([^"']+)["']""")
+_PYODIDE = re.compile(r'importScripts\("[^"]*/pyodide/(v[^/"]+)/')
+
+# Requirements are resolved by the worker relative to the bundle, so local
+# wheels are found wherever the page is.
+_INSTALL_BUNDLE = (
+    '{indent}from pyodide.http import pyfetch; _geno_bundle = "{bundle}"; '
+    "_geno_requirements = {requirements}\n"
+    "{indent}await micropip.install(["
+    '_geno_bundle.rpartition("/")[0] + r[1:] if r.startswith("./") else r '
+    "for r in (await (await pyfetch(_geno_bundle)).json())"
+    '["requirements"]]);'
+)
+
+
+def lock(requirement: str) -> str:
+    """Pin a bare package name to the version installed for the build.
+
+    Only pure Python packages are pinned: compiled ones such as numpy come
+    with Pyodide, which locks their versions itself.
+    """
+    if re.search(r"[^\w.-]", requirement):
+        # URLs, wheels and requirements with their own specifier.
+        return requirement
+    try:
+        distribution = importlib.metadata.distribution(requirement)
+    except importlib.metadata.PackageNotFoundError:
+        return requirement
+    if "Root-Is-Purelib: true" not in (distribution.read_text("WHEEL") or ""):
+        return requirement
+    return f"{requirement}=={distribution.version}"
+
+
+class PackageBundle:
+    """One locked set of Python requirements shared by every Pyodide page.
+
+    Panel writes the requirements of every page into its worker, so each
+    worker resolved and installed its own environment. geno collects them
+    into static/pyodide/bundle.<hash>.json together with the local wheels
+    of the ``pyodide`` key of geno.yml, and rewrites every worker to
+    install that bundle: readers moving between pages download the same
+    files, which their browser has cached. The bundle is only written when
+    its requirements change.
+    """
+
+    def __init__(self, state_path: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.outputs = load_state(state_path, [])
+        self.bundle = None
+        self.written = False
+        self.requirements = []
+        self.pages = {}
+
+    def _wheels(self, settings, root: pathlib.Path) -> list[tuple[pathlib.Path, str]]:
+        wheels = []
+        for pattern in settings.get("wheels", []):
+            for wheel in sorted(pathlib.Path().glob(pattern)):
+                url = f"./wheels/{wheel.name}"
+                dst = root / "wheels" / wheel.name
+                if not dst.exists() or dst.read_bytes() != wheel.read_bytes():
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(wheel, dst)
+                wheels.append((dst, url))
+        return wheels
+
+    def update(self, pages, static: pathlib.Path, settings) -> list[pathlib.Path]:
+        """Bundle the requirements of ``pages`` and return stale outputs."""
+        workers = {}
+        pyodide = None
+        for page in sorted(pages, key=lambda page: str(page.dst)):
+            worker = page.dst.with_suffix(".js")
+            if not worker.exists():
+                continue
+            script = worker.read_text()
+            match = _INSTALL.search(script)
+            if match is None:
+                continue
+            workers[worker] = script
+            self.pages[page] = _REQUIREMENT.findall(match[2] or match[3])
+            pyodide = pyodide or _PYODIDE.search(script)
+
+        outputs = []
+        if workers:
+            root = static / "pyodide"
+            wheels = self._wheels(settings, root)
+            for requirements in self.pages.values():
+                for requirement in map(lock, requirements):
+                    if requirement not in self.requirements:
+                        self.requirements.append(requirement)
+            self.requirements += [url for _, url in wheels]
+            bundle = {
+                "pyodide": pyodide[1] if pyodide else None,
+                "requirements": self.requirements,
+            }
+            data = json.dumps(bundle, indent=1).encode()
+            key = digest(data, *(wheel.read_bytes() for wheel, _ in wheels))
+            self.bundle = root / f"bundle.{key[:8]}.json"
+            if not self.bundle.exists():
+                root.mkdir(parents=True, exist_ok=True)
+                self.bundle.write_bytes(data)
+                self.written = True
+            outputs = [self.bundle, *(wheel for wheel, _ in wheels)]
+
+            for page, requirements in self.pages.items():
+                worker = page.dst.with_suffix(".js")
+                script = workers[worker]
+                url = os.path.relpath(self.bundle, worker.parent)
+
+                def install(match, url=url, requirements=requirements):
+                    return _INSTALL_BUNDLE.format(
+                        indent=match[1], bundle=url, requirements=requirements
+                    )
+
+                rewritten = _INSTALL.sub(install, script, count=1)
+                if rewritten != script:
+                    worker.write_text(rewritten)
+
+        removed = set(self.outputs) - {str(output) for output in outputs}
+        self.outputs = sorted(str(output) for output in outputs)
+        save_state(self.state_path, self.outputs)
+        return [pathlib.Path(output) for output in sorted(removed)]
+
+    def report(self) -> list[str]:
+        """Package count and bytes served by the site for every page."""
+        shared = self.bundle.stat().st_size + sum(
+            (self.bundle.parent / requirement[2:]).stat().st_size
+            for requirement in self.requirements
+            if requirement.startswith("./")
+        )
+        lines = []
+        for page, requirements in self.pages.items():
+            worker = page.dst.with_suffix(".js").stat().st_size
+            lines.append(
+                f"  {page.link.as_posix()}: {len(self.requirements)} packages "
+                f"({len(requirements)} of its own), "
+                f"{(worker + shared) / 1024:.0f} KB worker and bundle"
+            )
+        return lines
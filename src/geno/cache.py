@@ -0,0 +1,139 @@
+import importlib.metadata
+import json
+import os
+import pathlib
+import shutil
+
+from .manifest import digest, parse_size
+
+# Keys of geno.yml that change every page without being recorded as one of
+# its dependencies.
+SETTINGS = ["assets", "highlight_style", "pyodide", "python"]
+
+
+def _write(path: pathlib.Path, data: bytes) -> None:
+    # Several builds may share the cache, so files appear whole or not at all.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+class ArtifactCache:
+    """Rendered pages stored by the hash of everything they were built from.
+
+    Unlike the manifest under .geno, the cache can live outside the project,
+    e.g. in a directory CI persists between runs, so a fresh checkout
+    restores every page whose inputs did not change instead of rendering it.
+
+    For every page the cache remembers which dependency keys its last render
+    read. Their current values, together with the geno, Panel and Bokeh
+    versions and the SETTINGS of geno.yml, make the key of its outputs,
+    which are stored once by content under blobs/. Least recently used
+    files are evicted once the cache grows over ``max_size``.
+    """
+
+    def __init__(self, root: pathlib.Path, max_size: int, configuration, version):
+        self.root = root
+        self.max_size = max_size
+        self.environment = digest(
+            version,
+            importlib.metadata.version("panel"),
+            importlib.metadata.version("bokeh"),
+            json.dumps(
+                {key: configuration.get(key) for key in SETTINGS},
+                sort_keys=True,
+                default=str,
+            ),
+        )
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_configuration(cls, configuration, version, path=None):
+        """The cache of the ``cache`` key of geno.yml, or None when unset."""
+        settings = configuration.get("cache")
+        if path is None and not settings:
+            return None
+        settings = settings if isinstance(settings, dict) else {}
+        root = path or pathlib.Path(settings.get("path", ".geno/cache"))
+        max_size = parse_size(settings.get("max_size", "1 GB"))
+        return cls(pathlib.Path(root).expanduser(), max_size, configuration, version)
+
+    def _path(self, kind: str, key: str, suffix: str = "") -> pathlib.Path:
+        return self.root / kind / key[:2] / f"{key}{suffix}"
+
+    def _page_key(self, page) -> str:
+        return digest(self.environment, str(page.dst))
+
+    def _entry(self, page, values: dict) -> pathlib.Path:
+        key = digest(self._page_key(page), json.dumps(values, sort_keys=True))
+        return self._path("entries", key, ".json")
+
+    def restore(self, page, inputs) -> dict | None:
+        """Copy the cached outputs of ``page`` into place.
+
+        Returns the values of its dependencies for the manifest, or None
+        when the cache has no outputs for its current inputs.
+        """
+        recipe = self._path("pages", self._page_key(page), ".json")
+        try:
+            keys = json.loads(recipe.read_text())
+            values = inputs.values(keys, page.src)
+            entry = self._entry(page, values)
+            outputs = json.loads(entry.read_text())
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        blobs = [self._path("blobs", blob) for blob in outputs.values()]
+        if not all(blob.is_file() for blob in blobs):
+            self.misses += 1
+            return None
+        for output, blob in zip(outputs, blobs):
+            output = pathlib.Path(output)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(blob, output)
+        for path in [recipe, entry, *blobs]:
+            # Modification times order files for eviction.
+            os.utime(path)
+        self.hits += 1
+        return values
+
+    def store(self, page, values: dict) -> None:
+        """Add the freshly rendered outputs of ``page``."""
+        outputs = {}
+        for output in page.outputs:
+            data = output.read_bytes()
+            blob = digest(data)
+            path = self._path("blobs", blob)
+            if path.is_file():
+                os.utime(path)
+            else:
+                _write(path, data)
+            outputs[str(output)] = blob
+        _write(self._entry(page, values), json.dumps(outputs).encode())
+        recipe = self._path("pages", self._page_key(page), ".json")
+        _write(recipe, json.dumps(sorted(values)).encode())
+        self.stored += 1
+
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self._files())
+
+    def _files(self):
+        return (path for path in self.root.glob("*/*/*") if path.is_file())
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache fits."""
+        files = []
+        for path in self._files():
+            stat = path.stat()
+            files.append((stat.st_mtime, stat.st_size, path))
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
+            self.evicted += 1
@@ -6,6 +6,8 @@ def main():
     parser = argparse.ArgumentParser(description="My CLI Tool")
     subparsers = parser.add_subparsers(dest="command")
 
+    # Command modules only declare their arguments and import what they run
+    # in ``run``, so --help and version start without Panel and Bokeh.
     commands = ["new", "build", "serve", "version"]
     for command in commands:
         module = importlib.import_module(f"geno.cli.commands.{command}")
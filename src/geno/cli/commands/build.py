@@ -1,6 +1,5 @@
 import pathlib
-
-import geno.generator
+import sys
 
 
 def add_subparser(subparsers):
@@ -8,7 +7,61 @@ def add_subparser(subparsers):
     parser.add_argument(
         "configuration", type=pathlib.Path, help="geno configuration file"
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="discard previous build output and rebuild every page",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 for all cores)",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print why each page is being rebuilt",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        nargs="?",
+        const=pathlib.Path(".geno") / "profile.json",
+        metavar="TRACE",
+        help="time every phase and page, track peak memory and write a Chrome "
+        "trace (default: .geno/profile.json)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=pathlib.Path,
+        metavar="DIR",
+        help="restore unchanged pages from and store rendered pages in this "
+        "artifact cache (default: the cache key of the configuration)",
+    )
+    parser.add_argument(
+        "--diff-against",
+        type=pathlib.Path,
+        metavar="MANIFEST",
+        help="print the files added, changed and removed compared to a "
+        "changes manifest (e.g. .geno/changes.json of the deployed build) "
+        "instead of publishing the build to static/",
+    )
 
 
 def run(args):
-    geno.generator.run(args.configuration)
+    import geno.generator
+
+    try:
+        geno.generator.run(
+            args.configuration,
+            force=args.force,
+            jobs=args.jobs,
+            explain=args.explain,
+            trace=args.profile,
+            cache_path=args.cache,
+            diff_against=args.diff_against,
+        )
+    except geno.generator.BuildError as error:
+        sys.exit(str(error))
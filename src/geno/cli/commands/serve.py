@@ -1,7 +1,27 @@
+import pathlib
+
+
 def add_subparser(subparsers):
     parser = subparsers.add_parser("serve", help="Serve the project")
-    parser.add_argument("qwerty", help="Example argument for serve")
+    parser.add_argument(
+        "configuration", type=pathlib.Path, help="geno configuration file"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=128,
+        help="number of rendered pages kept in memory",
+    )
 
 
 def run(args):
-    print(f"Running serve with qwerty: {args.qwerty}")
+    import geno.server
+
+    geno.server.run(
+        args.configuration,
+        host=args.host,
+        port=args.port,
+        cache_size=args.cache_size,
+    )
@@ -0,0 +1,167 @@
+import concurrent.futures
+import gzip
+import os
+import pathlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .manifest import load_state, save_state
+
+# Suffixes worth compressing and the content type Apache should keep sending
+# for their compressed copies.
+COMPRESSIBLE = {
+    ".css": "text/css",
+    ".html": "text/html",
+    ".ico": "image/x-icon",
+    ".js": "text/javascript",
+    ".json": "application/json",
+    ".map": "application/json",
+    ".py": "text/x-python",
+    ".svg": "image/svg+xml",
+    ".txt": "text/plain",
+    ".xml": "application/xml",
+}
+
+ENCODINGS = {
+    "br": (".br", lambda data: brotli.compress(data, quality=11)),
+    "gzip": (".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+}
+
+
+def encodings(configuration) -> list[str]:
+    """The encodings requested by the ``compress`` key of geno.yml."""
+    requested = configuration.get("compress", False)
+    if requested is True:
+        requested = list(ENCODINGS)
+    if not requested:
+        return []
+    if brotli is None and "br" in requested:
+        print("brotli is not installed, skipping .br files")
+        requested = [encoding for encoding in requested if encoding != "br"]
+    return [encoding for encoding in ENCODINGS if encoding in requested]
+
+
+def _compress(src: pathlib.Path, encodings: list[str], incompressible: dict):
+    """Bring the compressed siblings of ``src`` up to date.
+
+    Returns the siblings, how many of them had to be written and the ones
+    not worth writing, with the size and mtime of ``src`` they were tried at.
+    """
+    stat = src.stat()
+    data = None
+    outputs = []
+    written = 0
+    skipped = {}
+    for encoding in encodings:
+        suffix, compress = ENCODINGS[encoding]
+        dst = src.with_name(src.name + suffix)
+        version = [stat.st_size, stat.st_mtime_ns]
+        if incompressible.get(str(dst)) == version:
+            skipped[str(dst)] = version
+            continue
+        try:
+            if dst.stat().st_mtime_ns == stat.st_mtime_ns:
+                outputs.append(dst)
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            data = src.read_bytes()
+        compressed = compress(data)
+        # Compressed copies that do not pay off are not worth serving.
+        if len(compressed) >= len(data):
+            dst.unlink(missing_ok=True)
+            skipped[str(dst)] = version
+            continue
+        dst.write_bytes(compressed)
+        os.utime(dst, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        outputs.append(dst)
+        written += 1
+    return outputs, written, skipped
+
+
+class Precompressor:
+    """Writes .gz and .br siblings of every compressible file under static/.
+
+    A compressed copy carries the modification time of its source, so it is
+    only written again once its source changed. Sources that do not compress
+    are remembered by size and mtime, so they are not tried again until they
+    change.
+    """
+
+    def __init__(self, state_path: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.outputs = []
+        self.incompressible = {}
+        self.written = 0
+        state = load_state(state_path, None)
+        if isinstance(state, dict):
+            self.outputs = state["outputs"]
+            self.incompressible = state["incompressible"]
+
+    def run(self, static: pathlib.Path, encodings: list[str], jobs: int):
+        """Compress ``static`` and return the copies that are no longer needed."""
+        sources = []
+        if encodings:
+            sources = [
+                path
+                for path in static.rglob("*")
+                if path.suffix in COMPRESSIBLE and path.is_file()
+            ]
+        # zlib and brotli release the GIL while compressing, so threads are
+        # enough to use every core.
+        outputs = []
+        incompressible = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            for siblings, written, skipped in executor.map(
+                lambda src: _compress(src, encodings, self.incompressible), sources
+            ):
+                outputs.extend(siblings)
+                incompressible.update(skipped)
+                self.written += written
+
+        removed = set(self.outputs) - {str(output) for output in outputs}
+        self.outputs = sorted(str(output) for output in outputs)
+        self.incompressible = dict(sorted(incompressible.items()))
+        save_state(
+            self.state_path,
+            {"outputs": self.outputs, "incompressible": self.incompressible},
+        )
+        return [pathlib.Path(output) for output in sorted(removed)]
+
+
+def htaccess(encodings: list[str]) -> list[str]:
+    """Apache rules serving precompressed siblings to clients accepting them."""
+    types = "|".join(sorted(suffix.lstrip(".") for suffix in COMPRESSIBLE))
+    suffixes = "|".join(ENCODINGS[encoding][0].lstrip(".") for encoding in encodings)
+    lines = ["<IfModule mod_rewrite.c>", "  RewriteEngine On"]
+    for encoding in encodings:
+        suffix = ENCODINGS[encoding][0]
+        lines += [
+            f"  RewriteCond %{{HTTP:Accept-Encoding}} \\b{encoding}\\b",
+            f"  RewriteCond %{{REQUEST_FILENAME}}{suffix} -f",
+            f'  RewriteRule "\\.({types})$" "%{{REQUEST_URI}}{suffix}" [QSA]',
+        ]
+    for suffix, content_type in COMPRESSIBLE.items():
+        lines.append(
+            f'  RewriteRule "\\{suffix}\\.({suffixes})$" "-" '
+            f"[T={content_type},E=no-gzip:1,E=no-brotli:1]"
+        )
+    lines += ["</IfModule>", "<IfModule mod_headers.c>"]
+    for encoding in encodings:
+        suffix = ENCODINGS[encoding][0]
+        lines += [
+            f'  <FilesMatch "\\.({types})\\{suffix}$">',
+            f"    Header set Content-Encoding {encoding}",
+            "  </FilesMatch>",
+        ]
+    lines += [
+        f'  <FilesMatch "\\.({types})(\\.({suffixes}))?$">',
+        "    Header append Vary Accept-Encoding",
+        "  </FilesMatch>",
+        "</IfModule>",
+    ]
+    return lines
@@ -0,0 +1,238 @@
+import contextlib
+import json
+import pathlib
+from collections.abc import Mapping
+
+from jinja2 import Environment
+
+from .manifest import digest
+
+# Dependencies are recorded as plain string keys:
+#
+#   source                     the page's own source file
+#   template:<name>            a file loaded from templates/
+#   collection:<name>          membership and order of site.pages.<name>, and
+#                              how many pages its listing is split into
+#   collection:<name>:<n>      the pages listed on page n of a paginated section
+#   pagination:<name>          how many pages a paginated section is split into
+#   page:<src>:<attribute>     an attribute of another page read by a template
+#   site:<key>                 any other key of the site model, site:pages
+#                              the names of its collections
+#   config:<key>               a key of geno.yml read by the page shell
+#   asset:<path>               the published URL of an asset
+#   image:<path>               the responsive variants of an image
+#   data:<glob>                files a Python page reads while running
+#   query:<json>               the result of a query of the site index
+#   highlight:<digest>         a code block read from the highlight cache,
+#                              content addressed so it never changes
+#   stylesheets, geno          the site stylesheets and the geno version
+
+_recorder = None
+
+
+class Recorder:
+    """Collects the dependency keys read while rendering one page."""
+
+    def __init__(self) -> None:
+        self.keys = {"source", "stylesheets", "geno"}
+
+    def site(self, site):
+        return _TrackedSite(site, self)
+
+
+@contextlib.contextmanager
+def recording():
+    global _recorder
+    previous, _recorder = _recorder, Recorder()
+    try:
+        yield _recorder
+    finally:
+        _recorder = previous
+
+
+def record(key: str) -> None:
+    if _recorder is not None:
+        _recorder.keys.add(key)
+
+
+class TrackingEnvironment(Environment):
+    """An Environment recording every template loaded, including through
+    ``extends`` and ``include``."""
+
+    def get_template(self, name, *args, **kwargs):
+        if isinstance(name, str):
+            record(f"template:{name}")
+        return super().get_template(name, *args, **kwargs)
+
+    def select_template(self, names, *args, **kwargs):
+        for name in names:
+            if isinstance(name, str):
+                record(f"template:{name}")
+        return super().select_template(names, *args, **kwargs)
+
+
+class _TrackedPage:
+    def __init__(self, page, recorder: Recorder) -> None:
+        self._page = page
+        self._recorder = recorder
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        self._recorder.keys.add(f"page:{self._page.src}:{key}")
+        return getattr(self._page, key)
+
+    __getitem__ = __getattr__
+
+
+class _TrackedCollection:
+    def __init__(self, name: str, pages, recorder: Recorder) -> None:
+        self._name = name
+        self._pages = pages
+        self._recorder = recorder
+
+    def _read(self):
+        self._recorder.keys.add(f"collection:{self._name}")
+        return self._pages
+
+    def __iter__(self):
+        return (_TrackedPage(page, self._recorder) for page in self._read())
+
+    def __len__(self) -> int:
+        return len(self._read())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_TrackedPage(page, self._recorder) for page in self._read()[index]]
+        return _TrackedPage(self._read()[index], self._recorder)
+
+
+class _TrackedPages(Mapping):
+    def __init__(self, pages: dict, recorder: Recorder) -> None:
+        self._pages = pages
+        self._recorder = recorder
+
+    def __getitem__(self, name):
+        self._recorder.keys.add(f"collection:{name}")
+        return _TrackedCollection(name, self._pages[name], self._recorder)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        # The names of the collections, see ``Inputs``.
+        self._recorder.keys.add("site:pages")
+        return iter(self._pages)
+
+    def __len__(self) -> int:
+        self._recorder.keys.add("site:pages")
+        return len(self._pages)
+
+
+class _TrackedSite(Mapping):
+    def __init__(self, site: dict, recorder: Recorder) -> None:
+        self._site = site
+        self._recorder = recorder
+
+    def __getitem__(self, key):
+        if key == "pages":
+            return _TrackedPages(self._site["pages"], self._recorder)
+        self._recorder.keys.add(f"site:{key}")
+        return self._site[key]
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __iter__(self):
+        return iter(self._site)
+
+    def __len__(self) -> int:
+        return len(self._site)
+
+
+def _hash(value) -> str:
+    return digest(json.dumps(value, sort_keys=True, default=str))
+
+
+def _file_hash(path: pathlib.Path) -> str:
+    return digest(path.read_bytes()) if path.is_file() else "missing"
+
+
+def data_files(pattern: str) -> list[pathlib.Path]:
+    return sorted(path for path in pathlib.Path().glob(pattern) if path.is_file())
+
+
+class Inputs:
+    """Evaluates dependency keys against the current state of the project."""
+
+    def __init__(
+        self, configuration, stylesheets, site, assets, version: str, index=None
+    ) -> None:
+        self.configuration = configuration
+        self.index = index
+        self.site = site
+        self.assets = assets
+        self.pages = {}
+        for page in site["pages"]["all"]:
+            # The first page of a paginated listing stands for its source.
+            self.pages.setdefault(str(page.src), page)
+        self.stylesheets = digest(*stylesheets)
+        self.version = version
+        self._cache = {}
+
+    def value(self, key: str, src: pathlib.Path) -> str:
+        if key == "source":
+            return _file_hash(src)
+        if key not in self._cache:
+            self._cache[key] = self._evaluate(key)
+        return self._cache[key]
+
+    def values(self, keys, src: pathlib.Path) -> dict[str, str]:
+        return {key: self.value(key, src) for key in sorted(keys)}
+
+    def _evaluate(self, key: str) -> str:
+        kind, _, name = key.partition(":")
+        match kind:
+            case "template":
+                return _file_hash(pathlib.Path("templates") / name)
+            case "collection":
+                pages = self.site["pages"].get(name)
+                return _hash(
+                    [
+                        None if pages is None else [str(p.src) for p in pages],
+                        self.site.get("pagination", {}).get(name),
+                    ]
+                )
+            case "page":
+                src, _, attribute = name.rpartition(":")
+                page = self.pages.get(src)
+                return _hash(None if page is None else getattr(page, attribute, None))
+            case "pagination":
+                return _hash(self.site.get("pagination", {}).get(name))
+            case "site" if name == "pages":
+                return _hash(sorted(self.site["pages"]))
+            case "site":
+                return _hash(self.site.get(name))
+            case "config":
+                return _hash(self.configuration.get(name))
+            case "asset":
+                return _hash(self.assets.urls.get(name.lstrip("/")))
+            case "image":
+                return _hash(self.assets.variants.get(name))
+            case "data":
+                return _hash([[str(p), _file_hash(p)] for p in data_files(name)])
+            case "query":
+                return _hash(None if self.index is None else self.index.result(name))
+            case "highlight":
+                return name
+            case "stylesheets":
+                return self.stylesheets
+            case "geno":
+                return self.version
+        return "unknown"
@@ -0,0 +1,151 @@
+import ctypes
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+
+from .manifest import load_state, save_state
+
+
+def _files(root: pathlib.Path) -> dict[str, pathlib.Path]:
+    if not root.is_dir():
+        return {}
+    return {
+        path.relative_to(root).as_posix(): path
+        for path in root.rglob("*")
+        if path.is_file()
+    }
+
+
+def _sync(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Make ``dst`` a copy of ``src``, copying only files that differ."""
+    sources = _files(src)
+    for name, path in _files(dst).items():
+        if name not in sources:
+            path.unlink()
+    for name, path in sources.items():
+        target = dst / name
+        stat = path.stat()
+        try:
+            current = target.stat()
+            if (current.st_size, current.st_mtime_ns) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                continue
+            target.unlink()
+        except FileNotFoundError:
+            target.parent.mkdir(parents=True, exist_ok=True)
+        # Never a hard link, even to assets published with ``link``: builds
+        # write some files in place, which would change static/ too.
+        shutil.copy2(path, target)
+    for directory in sorted(dst.rglob("*"), reverse=True):
+        if directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+
+
+def _exchange(a: pathlib.Path, b: pathlib.Path) -> bool:
+    """Swap two directories in one step where the system supports it."""
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):
+        return False
+    at_fdcwd, rename_exchange = -100, 2
+    result = renameat2(
+        at_fdcwd, os.fsencode(a), at_fdcwd, os.fsencode(b), rename_exchange
+    )
+    return result == 0
+
+
+def _sha256(path: pathlib.Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def changes(before: dict[str, str], after: dict[str, str]) -> dict:
+    """The files added, changed and removed going from ``before`` to ``after``."""
+    return {
+        "added": {name: after[name] for name in sorted(after.keys() - before.keys())},
+        "changed": {
+            name: after[name]
+            for name in sorted(after.keys() & before.keys())
+            if after[name] != before[name]
+        },
+        "removed": sorted(before.keys() - after.keys()),
+    }
+
+
+def load_files(path: pathlib.Path) -> dict[str, str]:
+    """The files of a changes manifest, or of a plain name to hash mapping."""
+    with open(path) as mf:
+        data = json.load(mf)
+    return data.get("files", data)
+
+
+class StagedBuild:
+    """Builds into a staging directory that replaces static/ when done.
+
+    static/ keeps serving the previous build until the new one is complete
+    and is then swapped for it in one rename. The staging directory starts
+    as a copy of static/, kept up to date by copying only files that
+    changed, so incremental builds stay incremental. A build that fails or
+    is not published leaves the staging directory pending, and the next
+    build continues from it.
+
+    Every published build writes a manifest of the files it added, changed
+    and removed with their SHA-256, for deploys that upload the delta only.
+    """
+
+    def __init__(self, state_path: pathlib.Path, static: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.static = static
+        self.staging = state_path.parent / "staging"
+        self.state = load_state(
+            state_path, {"pending": False, "files": {}, "published": {}}
+        )
+
+    def _save(self) -> None:
+        save_state(self.state_path, self.state)
+
+    def stage(self, force: bool) -> pathlib.Path:
+        """Prepare and return the directory to build into."""
+        if force:
+            shutil.rmtree(self.staging, ignore_errors=True)
+        elif not self.state["pending"]:
+            _sync(self.static, self.staging)
+        self.staging.mkdir(parents=True, exist_ok=True)
+        # Until published, the staging directory is ahead of static/.
+        self.state["pending"] = True
+        self._save()
+        return self.staging
+
+    def files(self) -> dict[str, str]:
+        """The hash of every staged file, rehashing only changed files."""
+        files = {}
+        for name, path in sorted(_files(self.staging).items()):
+            stat = path.stat()
+            previous = self.state["files"].get(name)
+            if previous and previous[:2] == [stat.st_size, stat.st_mtime_ns]:
+                files[name] = previous
+            else:
+                files[name] = [stat.st_size, stat.st_mtime_ns, _sha256(path)]
+        self.state["files"] = files
+        self._save()
+        return {name: entry[2] for name, entry in files.items()}
+
+    def publish(self, files: dict[str, str]) -> None:
+        """Swap the staged build into place."""
+        if not self.static.exists():
+            self.staging.rename(self.static)
+        elif not _exchange(self.staging, self.static):
+            previous = self.staging.with_name("previous")
+            shutil.rmtree(previous, ignore_errors=True)
+            self.static.rename(previous)
+            self.staging.rename(self.static)
+            previous.rename(self.staging)
+        # The staging directory now holds the previous build, which the next
+        # build brings up to date.
+        self.state["pending"] = False
+        self.state["published"] = files
+        self._save()
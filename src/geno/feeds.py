@@ -0,0 +1,169 @@
+import datetime
+import email.utils
+import pathlib
+import re
+import xml.etree.ElementTree as ET
+
+from .manifest import load_state, save_state
+from .pages import MarkdownPage
+from .pages.pagination import find_listing
+
+ATOM = "http://www.w3.org/2005/Atom"
+
+ET.register_namespace("atom", ATOM)
+
+_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+
+
+def _updated(page) -> datetime.datetime | None:
+    value = page.updated or page.date
+    if isinstance(value, datetime.datetime):
+        return value if value.tzinfo else value.replace(tzinfo=datetime.UTC)
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time(), datetime.UTC)
+    return None
+
+
+def _summary(page, length: int = 280) -> str:
+    """The page's own summary, or the first paragraph of its body."""
+    summary = page.summary or page.description or page.tagline
+    if summary is None and isinstance(page, MarkdownPage):
+        for paragraph in page.markdown.split("\n\n"):
+            paragraph = paragraph.strip()
+            if paragraph[:1].isalnum():
+                summary = _LINK.sub(r"\1", paragraph).replace("`", "")
+                break
+    summary = " ".join(str(summary or "").split())
+    if len(summary) > length:
+        summary = summary[:length].rsplit(" ", 1)[0] + "…"
+    return summary
+
+
+def _entries(pages, url: str, size: int) -> list[dict]:
+    dated = [page for page in pages if _updated(page) is not None]
+    dated.sort(key=_updated, reverse=True)
+    return [
+        {
+            "title": str(page.title or page.link.stem),
+            "link": f"{url}/{page.link.as_posix()}",
+            "updated": _updated(page),
+            "summary": _summary(page),
+            "tags": str(page.tags or "").split(),
+        }
+        for page in dated[:size]
+    ]
+
+
+def _element(parent, tag: str, text: str | None = None, **attributes):
+    element = ET.SubElement(parent, tag, attributes)
+    element.text = text
+    return element
+
+
+def _serialize(root) -> bytes:
+    ET.indent(root)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True) + b"\n"
+
+
+def atom(title: str, link: str, feed: str, author: str, entries) -> bytes:
+    root = ET.Element("feed", xmlns=ATOM)
+    _element(root, "title", title)
+    _element(root, "id", link)
+    _element(root, "link", href=feed, rel="self")
+    _element(root, "link", href=link)
+    # The newest entry rather than the build time, so feeds only change
+    # along with their entries.
+    updated = max((entry["updated"] for entry in entries), default=None)
+    if updated is not None:
+        _element(root, "updated", updated.isoformat())
+    _element(_element(root, "author"), "name", author)
+    for entry in entries:
+        item = _element(root, "entry")
+        _element(item, "title", entry["title"])
+        _element(item, "id", entry["link"])
+        _element(item, "link", href=entry["link"])
+        _element(item, "updated", entry["updated"].isoformat())
+        if entry["summary"]:
+            _element(item, "summary", entry["summary"])
+        for tag in entry["tags"]:
+            _element(item, "category", term=tag)
+    return _serialize(root)
+
+
+def rss(title: str, link: str, feed: str, entries) -> bytes:
+    root = ET.Element("rss", version="2.0")
+    channel = _element(root, "channel")
+    _element(channel, "title", title)
+    _element(channel, "link", link)
+    _element(channel, "description", title)
+    _element(channel, f"{{{ATOM}}}link", href=feed, rel="self")
+    updated = max((entry["updated"] for entry in entries), default=None)
+    if updated is not None:
+        _element(channel, "lastBuildDate", email.utils.format_datetime(updated))
+    for entry in entries:
+        item = _element(channel, "item")
+        _element(item, "title", entry["title"])
+        _element(item, "link", entry["link"])
+        _element(item, "guid", entry["link"], isPermaLink="true")
+        _element(item, "pubDate", email.utils.format_datetime(entry["updated"]))
+        if entry["summary"]:
+            _element(item, "description", entry["summary"])
+        for tag in entry["tags"]:
+            _element(item, "category", tag)
+    return _serialize(root)
+
+
+def _write(path: pathlib.Path, data: bytes) -> bool:
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+class Feeds:
+    """Atom and RSS feeds of the most recent pages of site sections.
+
+    Feeds are only written when their content changed, so unchanged feeds
+    keep their Last-Modified and ETag and polling readers get a 304.
+    """
+
+    def __init__(self, state_path: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.outputs = load_state(state_path, [])
+        self.written = 0
+
+    def update(self, configuration, site, content, static) -> list[pathlib.Path]:
+        """Write the feeds of the ``feeds`` key and return the stale ones."""
+        sizes = configuration.get("feeds", {})
+        url = configuration.get("url", "").rstrip("/")
+        if sizes and not url:
+            print("feeds need the url of the site in geno.yml, skipping them")
+            sizes = {}
+
+        outputs = []
+        for section, size in sizes.items():
+            entries = _entries(site["pages"].get(section, []), url, size)
+            page = find_listing(site["pages"]["all"], content, section)
+            link = f"{url}/{page.link.as_posix()}" if page is not None else f"{url}/"
+            name = page.title if page is not None and page.title else section.title()
+            title = f"{configuration['title']} - {name}"
+            author = configuration.get("author", configuration["title"])
+            feeds = {
+                "atom.xml": atom(
+                    title, link, f"{url}/{section}/atom.xml", author, entries
+                ),
+                "rss.xml": rss(title, link, f"{url}/{section}/rss.xml", entries),
+            }
+            for filename, data in feeds.items():
+                path = static / section / filename
+                self.written += _write(path, data)
+                outputs.append(str(path))
+
+        removed = set(self.outputs) - set(outputs)
+        self.outputs = sorted(outputs)
+        save_state(self.state_path, self.outputs)
+        return [pathlib.Path(output) for output in sorted(removed)]
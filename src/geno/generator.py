@@ -1,40 +1,109 @@
+import concurrent.futures
+import functools
+import json
+import os
 import pathlib
-import shutil
+import traceback
 
-import panel as pn
 import yaml
 
-from .pages import MarkdownPage, PyodidePage, RenderTemplate
+from . import compress, dependencies, images, profile
+from .__version__ import __version__
+from .assets import Assets
+from .bundle import PackageBundle
+from .cache import ArtifactCache
+from .deploy import StagedBuild, changes, load_files
+from .feeds import Feeds
+from .index import SiteIndex
+from .manifest import BuildManifest
+from .search import SearchIndex
+from .pages import (
+    MarkdownPage,
+    PaginatedPage,
+    PyodidePage,
+    PythonPage,
+    RenderTemplate,
+    TaxonomyPage,
+    convert,
+    register_global,
+)
+from .pages import highlight, taxonomy
+from .pages.pagination import collection, find_listing
+from .pages.python import Snapshots
+
+
+class BuildError(Exception):
+    pass
+
+
+# Configuration keys read by the page shell of every Markdown page.
+SHELL_CONFIGURATION = [
+    f"config:{key}"
+    for key in (
+        "title",
+        "header_color",
+        "header_background",
+        "logo",
+        "navigation",
+        "button",
+    )
+]
 
 
 class CSS:
-    def __init__(self, css_path: pathlib.Path) -> None:
+    def __init__(
+        self, css_path: pathlib.Path, highlight_style: str | None = None
+    ) -> None:
         self.stylesheets = [open(css).read() for css in css_path.glob("*.css")]
+        if highlight_style is not None:
+            from pygments.formatters import HtmlFormatter
 
+            # Code blocks are highlighted at build time and only need the
+            # stylesheet of their Pygments style.
+            formatter = HtmlFormatter(style=highlight_style)
+            self.stylesheets.append(formatter.get_style_defs(".codehilite"))
 
-def _make_static() -> pathlib.Path:
-    static = pathlib.Path("static")
-    if static.exists():
-        shutil.rmtree(
-            static,
-        )
-    static.mkdir()
-    return static
 
+def _htaccess(configuration, encodings) -> str:
+    lines = ["DirectoryIndex index.html"]
+    if encodings:
+        lines += compress.htaccess(encodings)
+    assets = configuration.get("assets", {})
+    if assets.get("fingerprint") or assets.get("shared") or configuration.get("images"):
+        lines += [
+            "<IfModule mod_headers.c>",
+            '  <FilesMatch "\\.[0-9a-f]{8}\\.[^./]+(\\.(gz|br))?$">',
+            '    Header set Cache-Control "public, max-age=31536000, immutable"',
+            "  </FilesMatch>",
+            "</IfModule>",
+        ]
+    if configuration.get("feeds"):
+        # Readers poll feeds, so let them revalidate instead of guessing.
+        lines += [
+            "<IfModule mod_headers.c>",
+            '  <FilesMatch "^(atom|rss)\\.xml(\\.(gz|br))?$">',
+            '    Header set Cache-Control "no-cache"',
+            "  </FilesMatch>",
+            "</IfModule>",
+        ]
+    return "\n".join(lines)
 
-def run(configuration_path: pathlib.Path) -> None:
-    with open(configuration_path) as cf:
-        configuration = yaml.safe_load(cf)
 
-    content = pathlib.Path("content")
-    css = CSS(pathlib.Path("assets") / "css")
+def _remove_outputs(outputs, static: pathlib.Path) -> None:
+    for output in outputs:
+        output.unlink(missing_ok=True)
+        for parent in output.parents:
+            if parent == static or not parent.is_relative_to(static):
+                break
+            if not parent.exists():
+                continue
+            if any(parent.iterdir()):
+                break
+            parent.rmdir()
 
-    static = _make_static()
-    shutil.copytree("./assets", static / "assets")
-    shutil.copy(configuration["favicon"], static / "favicon.ico")
-    with open(static / ".htaccess", "w") as htaccess:
-        htaccess.write("DirectoryIndex index.html")
 
+def discover(configuration, content: pathlib.Path, static: pathlib.Path) -> dict:
+    """Build the site model for every page under ``content``."""
     site = {"pages": {"all": []}, "title": configuration["title"]}
     for page in content.glob("**/*"):
         if "__pycache__" in page.parts:
@@ -44,9 +113,12 @@ def run(configuration_path: pathlib.Path) -> None:
 
         match page.suffix:
             case ".md":
-                site["pages"]["all"].append(MarkdownPage(page, dst))
+                site["pages"]["all"].append(MarkdownPage(page, dst, static))
             case ".py":
-                site["pages"]["all"].append(PyodidePage(page, dst))
+                python = PyodidePage(page, dst, static)
+                if python.mode == "static":
+                    python = PythonPage(page, dst, static)
+                site["pages"]["all"].append(python)
             case _:
                 continue
 
@@ -63,23 +135,568 @@ def run(configuration_path: pathlib.Path) -> None:
             project_pages = site["pages"].setdefault("projects", [])
             project_pages.append(site["pages"]["all"][-1])
 
-    blog_pages.sort(key=lambda p: p.date, reverse=True)
+        if "archives" in p.parts and p.stem != "index":
+            archive_pages = site["pages"].setdefault("archives", [])
+            archive_pages.append(site["pages"]["all"][-1])
+
+        for name in taxonomy.terms(site["pages"]["all"][-1], p):
+            site["pages"].setdefault(name, []).append(site["pages"]["all"][-1])
+
+    site["pages"].setdefault("blog", []).sort(key=lambda p: p.date, reverse=True)
+    if "archives" in site["pages"]:
+        site["pages"]["archives"].sort(key=lambda p: p.date, reverse=True)
+    _index_taxonomies(site, configuration.get("taxonomies", []), static)
+    _paginate(site, configuration.get("paginate", {}), content, static)
+    return site
+
+
+def _index_taxonomies(site, generated, static: pathlib.Path) -> None:
+    """List the terms of every taxonomy and add the pages of ``generated`` ones.
+
+    site.tags, site.sections, site.years and site.months list the terms, and
+    site.pages["tags/<tag>"] and the like hold their pages, newest first.
+    """
+    for name in taxonomy.TAXONOMIES:
+        site[name] = []
+    for name, pages in site["pages"].items():
+        kind, _, term = name.partition("/")
+        if kind in taxonomy.TAXONOMIES:
+            site[kind].append(term)
+            pages.sort(key=lambda page: str(page.date or ""), reverse=True)
+    for name in taxonomy.TAXONOMIES:
+        # Tags and sections read best alphabetically, dates newest first.
+        site[name].sort(reverse=name in ("years", "months"))
+    for name in generated:
+        pages = {}
+        for term in site[name]:
+            pages.setdefault(taxonomy.slug(term), []).append(term)
+        clashes = [
+            f"{name}/{slug}.html: {', '.join(terms)}"
+            for slug, terms in pages.items()
+            if len(terms) > 1
+        ]
+        if clashes:
+            # They would overwrite each other's page.
+            raise BuildError(
+                f"{len(clashes)} {name} page(s) shared by several terms:\n\n"
+                + "\n".join(clashes)
+            )
+        site["pages"]["all"].extend(
+            taxonomy.TaxonomyPage(name, term, static) for term in site[name]
+        )
+
+
+def _paginate(site, sizes: dict, content: pathlib.Path, static: pathlib.Path) -> None:
+    """Split the listing page of every section in ``sizes`` into pages,
+    e.g. blog.md listing site.pages.blog."""
+    site["pagination"] = {}
+    for section, size in sizes.items():
+        listing = find_listing(site["pages"]["all"], content, section)
+        if listing is None:
+            print(
+                f"Warning: not paginating {section}, there is no "
+                f"{content / section}.md or {content / section}/index.md"
+            )
+            continue
+        pages = site["pages"].get(section, [])
+        slices = [pages[start : start + size] for start in range(0, len(pages), size)]
+        slices = slices or [[]]
+        paginated = [
+            PaginatedPage(listing, static, section, number, len(slices))
+            for number in range(1, len(slices) + 1)
+        ]
+        for number, pages in enumerate(slices, 1):
+            site["pages"][collection(section, number)] = pages
+        site["pagination"][section] = len(slices)
+
+        # The first page replaces the listing wherever it appears, and the
+        # others follow it.
+        for name, pages in site["pages"].items():
+            site["pages"][name] = [
+                paginated[0] if page is listing else page for page in pages
+            ]
+        position = site["pages"]["all"].index(paginated[0]) + 1
+        site["pages"]["all"][position:position] = paginated[1:]
+
+
+def render_template(configuration, stylesheets, resources=None) -> RenderTemplate:
+    import panel as pn
 
     buttons = []
     for page_name, page_file in configuration["navigation"]["main"].items():
         button = pn.widgets.Button(
-            name=page_name, **configuration["button"], stylesheets=css.stylesheets
+            name=page_name, **configuration["button"], stylesheets=stylesheets
         )
         button.js_on_click(
             code=f'window.location = "/{"" if page_name == "Home" else page_name.lower() + ".html"}"'
         )
         buttons.append(button)
 
-    pn.template.BootstrapTemplate.config.raw_css.extend(css.stylesheets)
-
-    rt = RenderTemplate(
+    # Like Panel, treat stylesheets ending in .css as URLs.
+    return RenderTemplate(
         configuration,
         sidebar=pn.Row(pn.Spacer(width=configuration["button"]["width"]), *buttons),
+        raw_css=[css for css in stylesheets if not css.endswith(".css")],
+        css_files=[css for css in stylesheets if css.endswith(".css")],
+        resources=resources,
     )
-    for page in site["pages"]["all"]:
-        rt.render(page, site, css.stylesheets, sidebar_width=140)
+
+
+# Per-process render state, set once by _init_worker so that tasks only need
+# to carry a page index.
+_worker = {}
+
+
+def _init_worker(
+    configuration, stylesheets, site, assets, resources, index, profiling
+) -> None:
+    if profiling and not profile.enabled():
+        profile.start()
+    register_global("asset", assets.url)
+    register_global("picture", functools.partial(images.picture, assets))
+    register_global("query", index.query)
+    _worker["site"] = site
+    _worker["stylesheets"] = stylesheets
+    _worker["template"] = render_template(configuration, stylesheets, resources)
+
+
+def _render_page(index: int) -> tuple[int, str | None, set[str], list[dict]]:
+    page = _worker["site"]["pages"]["all"][index]
+    error = None
+    with dependencies.recording() as recorder:
+        recorder.keys.update(SHELL_CONFIGURATION)
+        try:
+            with profile.span(str(page.src), "page", src=str(page.src)):
+                _worker["template"].render(
+                    page,
+                    recorder.site(_worker["site"]),
+                    _worker["stylesheets"],
+                    sidebar_width=140,
+                )
+        except Exception:
+            error = traceback.format_exc()
+    return index, error, recorder.keys, profile.drain()
+
+
+def _render_pages(
+    indices, configuration, stylesheets, site, assets, resources, index, jobs: int
+):
+    initargs = (
+        configuration,
+        stylesheets,
+        site,
+        assets,
+        resources,
+        index,
+        profile.enabled(),
+    )
+    if not indices:
+        return
+    if jobs == 1 or len(indices) <= 1:
+        _init_worker(*initargs)
+        yield from map(_render_page, indices)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=initargs,
+    ) as executor:
+        futures = [executor.submit(_render_page, index) for index in indices]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def _shared_savings(configuration, site, inline, shared, resources, page) -> int:
+    """Bytes a Markdown page shrinks by when linking to shared resources."""
+    sizes = []
+    for stylesheets, localize in ((inline, None), (shared, resources)):
+        template = render_template(configuration, stylesheets, localize)
+        main = page.render(site, stylesheets)
+        shell = template.shell(main, sidebar_width=140)
+        sizes.append(len(shell.fill("").encode()))
+    return sizes[0] - sizes[1]
+
+
+def _check_weight(settings, pages, static: pathlib.Path) -> list[str]:
+    """Write the page weight report, print warnings and return the errors."""
+    from .weight import WeightReport
+
+    report = WeightReport(pathlib.Path(".geno") / "weight.json")
+    result = report.run(pages, static)
+    path = pathlib.Path(settings.get("report", ".geno/weight-report.json"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as rf:
+        json.dump(result, rf, indent=1, sort_keys=True)
+        rf.write("\n")
+    warnings, errors = report.check(settings.get("budgets", []))
+    for warning in warnings:
+        print(f"Warning: {warning}")
+    total = sum(weight["total"] for weight in result["pages"].values())
+    print(
+        f"Page weight: {total / 1024**2:.1f} MB over {len(result['pages'])} pages, "
+        f"{len(warnings)} warnings, {len(errors)} over budget, report in {path}"
+    )
+    return errors
+
+
+def run(
+    configuration_path: pathlib.Path,
+    force: bool = False,
+    jobs: int = 1,
+    explain: bool = False,
+    trace: pathlib.Path | None = None,
+    cache_path: pathlib.Path | None = None,
+    diff_against: pathlib.Path | None = None,
+) -> None:
+    if trace is not None:
+        profile.start()
+    events = []
+
+    with profile.span("configuration"):
+        with open(configuration_path) as cf:
+            configuration = yaml.safe_load(cf)
+
+        content = pathlib.Path("content")
+        css = CSS(pathlib.Path("assets") / "css", configuration.get("highlight_style"))
+
+        # Pages are built into a staging directory, static/ only changes
+        # once the build succeeded.
+        staged = StagedBuild(
+            pathlib.Path(".geno") / "deploy.json", pathlib.Path("static")
+        )
+        static = staged.stage(force)
+        manifest = BuildManifest(pathlib.Path(".geno") / "manifest.json")
+        if force:
+            manifest.clear()
+
+    jobs = jobs or os.cpu_count() or 1
+    encodings = compress.encodings(configuration)
+    with profile.span("assets"):
+        assets = Assets(
+            pathlib.Path(".geno") / "assets.json",
+            fingerprint=configuration.get("assets", {}).get("fingerprint", False),
+            link=configuration.get("assets", {}).get("link", False),
+        )
+        _remove_outputs(assets.sync(pathlib.Path("assets"), static), static)
+        assets.copy(pathlib.Path(configuration["favicon"]), static / "favicon.ico")
+        assets.write_manifest(static / "assets.json")
+        register_global("asset", assets.url)
+        htaccess = static / ".htaccess"
+        rules = _htaccess(configuration, encodings)
+        if not htaccess.exists() or htaccess.read_text() != rules:
+            htaccess.write_text(rules)
+
+        resources = None
+        stylesheets = css.stylesheets
+        resources_state = pathlib.Path(".geno") / "resources.json"
+        if configuration.get("assets", {}).get("shared", False):
+            from .resources import SharedResources
+
+            resources = SharedResources(static, resources_state)
+            stylesheets = [resources.stylesheet(css.stylesheets)]
+        elif resources_state.exists():
+            from .resources import SharedResources
+
+            shared = SharedResources(static, resources_state)
+            _remove_outputs(shared.clear(), static)
+
+    image_settings = images.settings(configuration)
+    with profile.span("images"):
+        variants = images.ImageVariants(
+            pathlib.Path(".geno") / "images.json", pathlib.Path(".geno") / "images"
+        )
+        _remove_outputs(variants.run(assets, static, image_settings, jobs), static)
+        register_global("picture", functools.partial(images.picture, assets))
+
+    with profile.span("discover"):
+        site = discover(configuration, content, static)
+        site_index = SiteIndex(pathlib.Path(".geno") / "site.db")
+        site_index.update(site["pages"]["all"])
+        register_global("query", site_index.query)
+
+        removed = manifest.prune(site["pages"]["all"])
+        _remove_outputs(removed, static)
+
+    search = configuration.get("search", False)
+    with profile.span("search"):
+        settings = search if isinstance(search, dict) else {}
+        search_index = SearchIndex(
+            pathlib.Path(".geno") / "search.json", settings.get("prefix", 2)
+        )
+        if search:
+            _remove_outputs(
+                search_index.update(site["pages"]["all"], static / "search"), static
+            )
+        elif search_index.state["pages"]:
+            _remove_outputs(search_index.clear(static / "search"), static)
+
+    with profile.span("feeds"):
+        feeds = Feeds(pathlib.Path(".geno") / "feeds.json")
+        _remove_outputs(feeds.update(configuration, site, content, static), static)
+
+    with profile.span("dependencies"):
+        inputs = dependencies.Inputs(
+            configuration, stylesheets, site, assets, __version__, site_index
+        )
+        stale = {}
+        for index, page in enumerate(site["pages"]["all"]):
+            reasons = ["--force"] if force else manifest.changes(page, inputs)
+            if reasons:
+                stale[index] = reasons
+
+    cache = ArtifactCache.from_configuration(configuration, __version__, cache_path)
+    if cache is not None and not force:
+        with profile.span("restore cached pages"):
+            for index in list(stale):
+                page = site["pages"]["all"][index]
+                values = cache.restore(page, inputs)
+                if values is None:
+                    continue
+                if resources is not None and not all(
+                    resources.republish(output) for output in page.outputs
+                ):
+                    stale[index] = ["links to missing shared resources"]
+                    continue
+                manifest.record(page, values)
+                del stale[index]
+    if explain:
+        for index, reasons in stale.items():
+            page = site["pages"]["all"][index]
+            # Generated pages share or lack a source, their output tells them apart.
+            name = page.src
+            if isinstance(page, (PaginatedPage, TaxonomyPage)):
+                name = page.dst
+            print(f"{name}: {'; '.join(reasons)}")
+
+    errors = {}
+    apps = {}
+    snapshots = Snapshots(
+        pathlib.Path(".geno") / "snapshots", configuration.get("python", {}), jobs
+    )
+    snapshot_apps = {}
+    with profile.span("python templates"):
+        for index in stale:
+            page = site["pages"]["all"][index]
+            if not isinstance(page, (PyodidePage, PythonPage)):
+                continue
+            with dependencies.recording() as recorder:
+                try:
+                    with profile.span(str(page.src), "page", src=str(page.src)):
+                        page.dst.parent.mkdir(parents=True, exist_ok=True)
+                        app = page.render(recorder.site(site), stylesheets)
+                except Exception:
+                    errors[index] = f"{page.src}:\n{traceback.format_exc()}"
+                    continue
+            if isinstance(page, PythonPage):
+                # Snapshots run in their own processes alongside everything else.
+                snapshots.start(index, page, app)
+                snapshot_apps[index] = recorder.keys
+            else:
+                apps[index] = recorder.keys
+
+    # Pyodide conversion runs alongside the Markdown pages.
+    pages = site["pages"]["all"]
+    conversion_trace = None if trace is None else trace.with_suffix(".convert.json")
+    conversion = None
+    if apps:
+        conversion = convert((pages[index] for index in apps), conversion_trace)
+    markdown = [
+        index
+        for index in stale
+        if index not in apps and index not in snapshot_apps and index not in errors
+    ]
+    try:
+        with profile.span("markdown pages", jobs=jobs):
+            for index, error, keys, page_events in _render_pages(
+                markdown,
+                configuration,
+                stylesheets,
+                site,
+                assets,
+                resources,
+                site_index,
+                jobs,
+            ):
+                events.extend(page_events)
+                page = pages[index]
+                if error is None:
+                    values = inputs.values(keys, page.src)
+                    manifest.record(page, values)
+                    if cache is not None:
+                        cache.store(page, values)
+                else:
+                    errors[index] = f"{page.src}:\n{error}"
+    finally:
+        if snapshot_apps:
+            with profile.span("python snapshots"):
+                failed = snapshots.join()
+            for index, keys in snapshot_apps.items():
+                page = pages[index]
+                if index in failed:
+                    errors[index] = failed[index]
+                else:
+                    values = inputs.values(keys, page.src)
+                    manifest.record(page, values)
+                    if cache is not None:
+                        cache.store(page, values)
+        snapshots.prune(page for page in pages if isinstance(page, PythonPage))
+        if conversion is not None:
+            with profile.span("pyodide conversion"):
+                conversion.join()
+            if conversion_trace is not None and conversion_trace.exists():
+                events.extend(json.loads(conversion_trace.read_text()))
+                conversion_trace.unlink()
+        # Every worker installs the bundle, including those converted before.
+        with profile.span("pyodide bundle"):
+            bundle = PackageBundle(pathlib.Path(".geno") / "pyodide.json")
+            pyodide_pages = [page for page in pages if isinstance(page, PyodidePage)]
+            _remove_outputs(
+                bundle.update(pyodide_pages, static, configuration.get("pyodide", {})),
+                static,
+            )
+        if conversion is not None:
+            failed = [
+                index
+                for index in apps
+                if not all(output.exists() for output in pages[index].outputs)
+            ]
+            if conversion.exitcode and not failed:
+                failed = list(apps)
+            for index, keys in apps.items():
+                page = pages[index]
+                if index in failed:
+                    errors[index] = (
+                        f"{page.src}:\nPyodide conversion failed "
+                        f"(exit code {conversion.exitcode})\n"
+                    )
+                else:
+                    values = inputs.values(keys, page.src)
+                    manifest.record(page, values)
+                    if cache is not None:
+                        cache.store(page, values)
+        # Failed pages keep their outputs tracked so they are cleaned up
+        # should the source go away, but are never considered fresh.
+        for index in errors:
+            manifest.record_failure(pages[index])
+        manifest.save()
+
+    with profile.span("highlight cache"):
+        highlight.prune(manifest)
+
+    if resources is not None:
+        # Only now are the pages linking to stale resources rendered again.
+        with profile.span("shared resources"):
+            _remove_outputs(resources.update(), static)
+
+    with profile.span("compress"):
+        precompressor = compress.Precompressor(
+            pathlib.Path(".geno") / "compressed.json"
+        )
+        _remove_outputs(
+            precompressor.run(static, encodings, os.cpu_count() or 1), static
+        )
+
+    print(
+        f"Rendered {len(stale) - len(errors)} pages, "
+        f"skipped {len(pages) - len(stale)} unchanged, "
+        f"removed {len(removed)} stale outputs, copied {assets.copied} assets, "
+        f"compressed {precompressor.written} files"
+    )
+    if image_settings is not None:
+        print(
+            f"Images: {len(variants.outputs)} variants of {len(assets.variants)} "
+            f"images, encoded {variants.encoded}, pruned {variants.pruned}"
+        )
+    if bundle.bundle is not None:
+        print(
+            f"Pyodide bundle: {len(bundle.requirements)} packages in "
+            f"{bundle.bundle}{' (rewritten)' if bundle.written else ''}"
+        )
+        print("\n".join(bundle.report()))
+    if snapshot_apps:
+        print(
+            f"Python snapshots: ran {snapshots.executed}, "
+            f"restored {snapshots.restored} from .geno/snapshots, "
+            f"pruned {snapshots.pruned}"
+        )
+    if cache is not None:
+        with profile.span("evict cached pages"):
+            cache.evict()
+        looked_up = cache.hits + cache.misses
+        print(
+            f"Cache: {cache.hits} hits, {cache.misses} misses"
+            + (f" ({cache.hits / looked_up:.0%} hit rate)" if looked_up else "")
+            + f", stored {cache.stored}, evicted {cache.evicted} files, "
+            f"{cache.size() / 1024**2:.1f} MB in {cache.root}"
+        )
+    if feeds.outputs:
+        print(f"Feeds: {len(feeds.outputs)} feeds, rewrote {feeds.written}")
+    if search:
+        stats = search_index.stats
+        print(
+            f"Search index: {stats['terms']} terms in {stats['shards']} shards "
+            f"({stats['size'] / 1024:.0f} KB), rewrote {stats['written']} shards"
+        )
+    rendered = [pages[index] for index in markdown if index not in errors]
+    if resources is not None and rendered:
+        with profile.span("shared resources"):
+            saved = _shared_savings(
+                configuration,
+                site,
+                css.stylesheets,
+                stylesheets,
+                resources,
+                rendered[0],
+            )
+        files, size = resources.size()
+        print(
+            f"Shared {files} resource files ({size / 1024:.0f} KB) from "
+            f"{resources.root}, saving {saved} bytes per page "
+            f"({saved * len(rendered) / 1024:.0f} KB over {len(rendered)} pages)"
+        )
+    over_budget = []
+    if configuration.get("weight") is not None:
+        with profile.span("page weight"):
+            over_budget = _check_weight(configuration["weight"], pages, static)
+    with profile.span("publish"):
+        files = staged.files()
+        if diff_against is not None:
+            delta = changes(load_files(diff_against), files)
+            print(
+                f"Changes against {diff_against}: {len(delta['added'])} added, "
+                f"{len(delta['changed'])} changed, {len(delta['removed'])} removed"
+            )
+            for mark, names in (("+", delta["added"]), ("~", delta["changed"])):
+                for name in names:
+                    print(f"  {mark} {name}")
+            for name in delta["removed"]:
+                print(f"  - {name}")
+        elif not errors and not over_budget:
+            delta = changes(staged.state["published"], files)
+            report = pathlib.Path(".geno") / "changes.json"
+            with open(report, "w") as rf:
+                json.dump({**delta, "files": files}, rf, indent=1)
+                rf.write("\n")
+            staged.publish(files)
+            print(
+                f"Published {len(files)} files to {staged.static}: "
+                f"{len(delta['added'])} added, {len(delta['changed'])} changed, "
+                f"{len(delta['removed'])} removed, see {report}"
+            )
+    if trace is not None:
+        events.extend(profile.drain())
+        profile.stop()
+        profile.write_trace(events, trace)
+        print(profile.summary(events))
+        print(f"Wrote trace to {trace}")
+    if errors:
+        raise BuildError(
+            f"{len(errors)} page(s) failed to render:\n\n"
+            + "\n".join(errors[index] for index in sorted(errors))
+        )
+    if over_budget:
+        raise BuildError(
+            f"{len(over_budget)} page(s) over their weight budget:\n\n"
+            + "\n".join(over_budget)
+        )
@@ -0,0 +1,196 @@
+import concurrent.futures
+import html
+import pathlib
+
+from . import dependencies
+from .assets import fingerprinted
+from .manifest import digest, load_state, save_state
+
+# Images worth resizing; GIFs may be animated and icons are already small.
+RESIZABLE = {".jpeg": "jpeg", ".jpg": "jpeg", ".png": "png", ".webp": "webp"}
+
+FORMATS = {"avif": "image/avif", "webp": "image/webp"}
+
+_SUFFIXES = {"avif": ".avif", "jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+
+
+def settings(configuration) -> dict | None:
+    """The ``images`` key of geno.yml with its defaults, or None when unset."""
+    images = configuration.get("images")
+    if not images:
+        return None
+    if images is True:
+        images = {}
+    formats = images.get("formats", list(FORMATS))
+    if "avif" in formats:
+        from PIL import features
+
+        if not features.check("avif"):
+            print("Pillow was built without AVIF support, skipping .avif images")
+            formats = [fmt for fmt in formats if fmt != "avif"]
+    return {
+        "widths": sorted(images.get("widths", [480, 960, 1600])),
+        "formats": [fmt for fmt in FORMATS if fmt in formats],
+        "quality": images.get("quality", 80),
+    }
+
+
+def _encode(image, fmt: str, quality: int, dst: pathlib.Path) -> None:
+    options = {"format": fmt.upper()}
+    if fmt == "jpeg":
+        image = image.convert("RGB")
+        options.update(quality=quality, optimize=True, progressive=True)
+    elif fmt == "png":
+        options.update(optimize=True)
+    else:
+        options.update(quality=quality)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    image.save(tmp, **options)
+    tmp.replace(dst)
+
+
+def _resize(src: str, variants: list) -> int:
+    """Encode the missing ``variants`` of ``src`` and return how many."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            alpha = "A" in image.mode or "transparency" in image.info
+            image = image.convert("RGBA" if alpha else "RGB")
+        # Every width is resized from the next wider one rather than from the
+        # full-size source, which is what takes time for large banners.
+        resized = {}
+        for width in sorted({variant[0] for variant in variants}, reverse=True):
+            height = round(image.height * width / image.width)
+            image = image.resize(
+                (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
+            resized[width] = image
+        for width, fmt, quality, path in variants:
+            _encode(resized[width], fmt, quality, pathlib.Path(path))
+    return len(variants)
+
+
+class ImageVariants:
+    """Resized and WebP/AVIF copies of assets/images for responsive pages.
+
+    Variants are cached under .geno/images by the digest of their source and
+    settings, so only new or changed images are encoded, and published next
+    to their source under fingerprinted names. Cached variants no image uses
+    any more are pruned.
+    """
+
+    def __init__(self, state_path: pathlib.Path, cache: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.cache = cache
+        self.outputs = load_state(state_path, [])
+        self.encoded = 0
+        self.pruned = 0
+
+    def run(self, assets, static: pathlib.Path, settings, jobs: int):
+        """Publish the variants of every image and return the stale ones."""
+        assets.variants = {}
+        tasks = {}
+        published = []
+        images = {}
+        if settings is not None:
+            # Without ``images`` the run only prunes, Pillow is not needed.
+            import PIL
+            from PIL import Image
+
+            images = assets.state["files"]
+        for path, (_, _, source) in images.items():
+            fmt = RESIZABLE.get(pathlib.PurePosixPath(path).suffix.lower())
+            if fmt is None or not path.startswith("assets/images/"):
+                continue
+            with Image.open(path) as image:
+                size = image.size
+            widths = [width for width in settings["widths"] if width < size[0]]
+            files = {}
+            formats = [output for output in settings["formats"] if output != fmt]
+            for output in [fmt, *formats]:
+                files[output] = []
+                # The source itself is the widest image in its own format.
+                # Other formats stop at the widest configured width, as
+                # encoding huge banners takes seconds for no visible gain.
+                extra = size[0] <= settings["widths"][-1] and output != fmt
+                for width in widths + ([size[0]] if extra else []):
+                    key = digest(
+                        PIL.__version__,
+                        source,
+                        str(width),
+                        output,
+                        str(settings["quality"]),
+                    )
+                    cached = self.cache / key[:2] / f"{key}{_SUFFIXES[output]}"
+                    if not cached.exists():
+                        tasks.setdefault(path, []).append(
+                            (width, output, settings["quality"], str(cached))
+                        )
+                    stem = path.rpartition(".")[0]
+                    url = fingerprinted(f"{stem}-{width}w{_SUFFIXES[output]}", key)
+                    published.append((cached, static / url))
+                    files[output].append([url, width])
+                if output == fmt:
+                    files[output].append([assets.urls.get(path, path), size[0]])
+            assets.variants[path] = {"size": list(size), "files": files}
+
+        if len(tasks) > 1 and jobs > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                self.encoded += sum(executor.map(_resize, tasks, tasks.values()))
+        else:
+            self.encoded += sum(map(_resize, tasks, tasks.values()))
+
+        outputs = []
+        for cached, dst in published:
+            # Cached files never change once written, so size and mtime tell
+            # whether the published copy is current.
+            assets.copy(cached, dst)
+            outputs.append(str(dst))
+
+        used = {cached for cached, _ in published}
+        for cached in self.cache.glob("*/*"):
+            if cached not in used:
+                cached.unlink()
+                self.pruned += 1
+                if not any(cached.parent.iterdir()):
+                    cached.parent.rmdir()
+
+        removed = set(self.outputs) - set(outputs)
+        self.outputs = sorted(outputs)
+        save_state(self.state_path, self.outputs)
+        return [pathlib.Path(output) for output in sorted(removed)]
+
+
+def picture(assets, path: str, alt: str = "", sizes: str = "100vw") -> str:
+    """Template helper emitting a ``<picture>`` with the variants of ``path``.
+
+    Browsers pick the best format they support and the smallest width that
+    fits ``sizes``; without variants this is a plain ``<img>``.
+    """
+    dependencies.record(f"image:{path.lstrip('/')}")
+    root = "/" if path.startswith("/") else ""
+    src = assets.url(path)
+    variants = assets.variants.get(path.lstrip("/"))
+    alt = html.escape(alt)
+    if variants is None:
+        return f'<img src="{src}" alt="{alt}" loading="lazy">'
+
+    def srcset(files):
+        return ", ".join(f"{root}{url.lstrip('/')} {width}w" for url, width in files)
+
+    width, height = variants["size"]
+    formats = list(variants["files"])
+    sources = "".join(
+        f'<source type="{FORMATS[fmt]}" srcset="{srcset(variants["files"][fmt])}" '
+        f'sizes="{sizes}">'
+        for fmt in formats[1:]
+    )
+    return (
+        f"<picture>{sources}"
+        f'<img src="{src}" srcset="{srcset(variants["files"][formats[0]])}" '
+        f'sizes="{sizes}" width="{width}" height="{height}" alt="{alt}" '
+        'loading="lazy" decoding="async"></picture>'
+    )
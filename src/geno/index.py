@@ -0,0 +1,147 @@
+import json
+import pathlib
+import sqlite3
+
+from . import dependencies
+from .manifest import digest
+from .pages import PaginatedPage, TaxonomyPage, taxonomy
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE pages (
+    link TEXT PRIMARY KEY,
+    src TEXT NOT NULL,
+    title TEXT,
+    date TEXT,
+    section TEXT,
+    tags TEXT NOT NULL,
+    readtime INTEGER,
+    digest TEXT NOT NULL
+);
+CREATE TABLE tags (
+    link TEXT NOT NULL REFERENCES pages(link) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, link)
+) WITHOUT ROWID;
+CREATE INDEX pages_date ON pages(date);
+CREATE INDEX pages_section_date ON pages(section, date);
+CREATE INDEX tags_link ON tags(link);
+"""
+
+
+def _row(page) -> dict:
+    date = page.date
+    return {
+        "link": page.link.as_posix(),
+        "src": str(page.src),
+        "title": None if page.title is None else str(page.title),
+        "date": None if date is None else str(date),
+        "section": taxonomy.section(page, page.link),
+        "tags": " ".join(taxonomy.tags(page)),
+        "readtime": page.readtime,
+    }
+
+
+class SiteIndex:
+    """An SQLite index of the frontmatter of every page, for templates.
+
+    Templates query it with ``query(sql, *parameters)``, e.g. the latest
+    posts tagged c++::
+
+        {% for post in query("SELECT pages.* FROM pages JOIN tags USING (link)
+                              WHERE tag = ? ORDER BY date DESC LIMIT ?",
+                             "c++", 5) %}
+
+    The ``pages`` table has link, src, title, date, section, tags (space
+    separated) and readtime, the ``tags`` table one row per page and tag.
+    Only changed pages are written, results are memoized for the build,
+    and every query is a dependency of the pages running it, so they are
+    rendered again only when its result changes.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.updated = 0
+        self._connection = None
+        self._results = {}
+
+    def __getstate__(self):
+        # Workers open their own read-only connection.
+        return {"path": self.path, "updated": self.updated}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(state["path"])
+        self.updated = state["updated"]
+
+    def update(self, pages) -> None:
+        """Bring the index in line with ``pages``, writing only changed rows."""
+        rows = {}
+        for page in pages:
+            # Term pages and later pages of a listing have no frontmatter
+            # of their own.
+            if isinstance(page, TaxonomyPage) or (
+                isinstance(page, PaginatedPage) and page.number > 1
+            ):
+                continue
+            row = _row(page)
+            row["digest"] = digest(json.dumps(row, sort_keys=True, default=str))
+            rows.setdefault(row["link"], row)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.path) as db:
+            db.execute("PRAGMA foreign_keys = ON")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                db.executescript(
+                    "DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS pages;"
+                    + SCHEMA
+                    + f"PRAGMA user_version = {SCHEMA_VERSION};"
+                )
+            indexed = dict(db.execute("SELECT link, digest FROM pages"))
+            stale = [link for link in indexed if link not in rows]
+            db.executemany("DELETE FROM pages WHERE link = ?", [(s,) for s in stale])
+            for link, row in rows.items():
+                if indexed.get(link) == row["digest"]:
+                    continue
+                db.execute("DELETE FROM pages WHERE link = ?", (link,))
+                db.execute(
+                    "INSERT INTO pages VALUES (:link, :src, :title, :date, "
+                    ":section, :tags, :readtime, :digest)",
+                    row,
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO tags VALUES (?, ?)",
+                    [(link, tag) for tag in row["tags"].split()],
+                )
+                self.updated += 1
+            self.updated += len(stale)
+        db.close()
+        self._results = {}
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _run(self, sql: str, parameters: tuple) -> list[dict]:
+        # Parameters read from templates or dependency keys may be lists.
+        key = json.dumps([sql, list(parameters)])
+        if key not in self._results:
+            if self._connection is None:
+                uri = f"{self.path.resolve().as_uri()}?mode=ro"
+                self._connection = sqlite3.connect(uri, uri=True)
+                self._connection.row_factory = sqlite3.Row
+            rows = self._connection.execute(sql, parameters).fetchall()
+            self._results[key] = [dict(row) for row in rows]
+        return self._results[key]
+
+    def query(self, sql: str, *parameters) -> list[dict]:
+        """Template helper running a read-only, parameterized query."""
+        dependencies.record(f"query:{json.dumps([sql, list(parameters)])}")
+        return self._run(sql, parameters)
+
+    def result(self, name: str):
+        """The result of the query of a ``query:`` dependency key."""
+        sql, parameters = json.loads(name)
+        try:
+            return self._run(sql, tuple(parameters))
+        except sqlite3.Error as error:
+            return str(error)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import pathlib
+import re
+
+
+def digest(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+_UNITS = {"b": 1, "kb": 1024, "mb": 1024**2, "gb": 1024**3}
+
+
+def parse_size(value) -> int:
+    """Sizes are bytes, or strings such as ``"300 KB"`` or ``"2.5 MB"``."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kmg]?b)?\s*", str(value), re.I)
+    if match is None:
+        raise ValueError(f"not a size: {value!r}")
+    return int(float(match[1]) * _UNITS[(match[2] or "b").lower()])
+
+
+def load_state(path: pathlib.Path, default):
+    """The state a build saved to ``path``, or ``default`` before the first."""
+    if not path.exists():
+        return default
+    with open(path) as sf:
+        return json.load(sf)
+
+
+def save_state(path: pathlib.Path, state) -> None:
+    """Save the state of a build step under .geno for the next build."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as sf:
+        json.dump(state, sf, indent=1)
+
+
+class BuildManifest:
+    """Records the dependencies and outputs of every page rendered into static/.
+
+    Entries are keyed by the page's output, as a paginated listing renders
+    several pages from one source.
+    """
+
+    VERSION = 3
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.pages = {}
+        data = load_state(path, {})
+        if data.get("version") == self.VERSION:
+            self.pages = data["pages"]
+
+    def changes(self, page, inputs) -> list[str]:
+        """Return why ``page`` needs rendering, or nothing when it is fresh."""
+        entry = self.pages.get(str(page.dst))
+        if entry is None:
+            return ["not built before"]
+        if entry.get("failed"):
+            return ["failed in the previous build"]
+        reasons = [
+            f"{key} changed"
+            for key, value in entry["dependencies"].items()
+            if inputs.value(key, page.src) != value
+        ]
+        reasons.extend(
+            f"{output} is missing"
+            for output in entry["outputs"]
+            if not pathlib.Path(output).exists()
+        )
+        return reasons
+
+    def record(self, page, dependencies: dict) -> None:
+        self.pages[str(page.dst)] = {
+            "dependencies": dependencies,
+            "outputs": [str(output) for output in page.outputs],
+        }
+
+    def record_failure(self, page) -> None:
+        self.pages[str(page.dst)] = {
+            "failed": True,
+            "dependencies": {},
+            "outputs": [str(output) for output in page.outputs],
+        }
+
+    def prune(self, pages) -> list[pathlib.Path]:
+        """Forget pages that are no longer built and return their outputs."""
+        current = {str(page.dst) for page in pages}
+        removed = []
+        for dst in list(self.pages):
+            if dst not in current:
+                removed.extend(map(pathlib.Path, self.pages.pop(dst)["outputs"]))
+        return removed
+
+    def clear(self) -> None:
+        self.pages = {}
+
+    def save(self) -> None:
+        save_state(self.path, {"version": self.VERSION, "pages": self.pages})
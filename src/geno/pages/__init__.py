@@ -1,14 +1,36 @@
 import functools
+import io
 
-import panel as pn
-
+from .. import profile
+from .environment import environment
 from .markdown import MarkdownPage
+from .pagination import PaginatedPage
 from .python import PythonPage
-from .pyodide import PyodidePage
+from .pyodide import PyodidePage, convert
+from .reproducible import canonical_ids, stable_ids
+from .shell import PLACEHOLDER, Shell
+from .taxonomy import TaxonomyPage
+
+
+def register_global(name: str, value) -> None:
+    """Make ``value`` available to every page template as ``name``."""
+    environment.globals[name] = value
 
 
 class RenderTemplate:
-    def __init__(self, configuration, header=None, sidebar=None, modal=None):
+    def __init__(
+        self,
+        configuration,
+        header=None,
+        sidebar=None,
+        modal=None,
+        raw_css=None,
+        css_files=None,
+        resources=None,
+    ):
+        import panel as pn
+
+        self.resources = resources
         self.template = functools.partial(
             pn.template.BootstrapTemplate,
             title=configuration["title"],
@@ -19,12 +41,43 @@ class RenderTemplate:
             header=header or [],
             sidebar=sidebar or [],
             modal=modal or [],
+            raw_css=raw_css or [],
+            css_files=css_files or [],
         )
+        self.shells = {}
+
+    def shell(self, main, **kwargs) -> Shell:
+        """The saved template around ``main``, shared by panes configured alike."""
+        parameters = {
+            name: value
+            for name, value in main.param.values().items()
+            if name not in ("name", "object")
+        }
+        key = repr((type(main), sorted(parameters.items()), sorted(kwargs.items())))
+        if key not in self.shells:
+            with stable_ids("shell"):
+                tmp = self.template(main=main.clone(object=PLACEHOLDER), **kwargs)
+                html = io.StringIO()
+                tmp.save(html)
+            html = canonical_ids(html.getvalue())
+            if self.resources is not None:
+                html = self.resources.localize(html)
+            self.shells[key] = Shell(html)
+        return self.shells[key]
+
+    def html(self, page, site, stylesheets, **kwargs) -> str:
+        with profile.span("jinja", "render"):
+            main = page.render(site, stylesheets)
+        with profile.span("template", "render"):
+            shell = self.shell(main, **kwargs)
+        with profile.span("save", "render"):
+            return shell.fill(main.get_root().text)
 
     def render(self, page, site, stylesheets, **kwargs):
         page.dst.parent.mkdir(parents=True, exist_ok=True)
         if isinstance(page, MarkdownPage):
-            tmp = self.template(main=page.render(site, stylesheets), **kwargs)
-            tmp.save(page.dst)
+            html = self.html(page, site, stylesheets, **kwargs)
+            with open(page.dst, "w") as dst:
+                dst.write(html)
         else:
             page.render(site, stylesheets)
@@ -0,0 +1,53 @@
+import os
+import pathlib
+
+from jinja2 import (
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    FunctionLoader,
+)
+
+from ..dependencies import TrackingEnvironment
+from ..manifest import digest
+
+_STRING_PREFIX = "@string/"
+
+# Sources handed to ``from_cached_string`` that are waiting to be loaded.
+_strings = {}
+
+
+def _load_string(name: str):
+    source = _strings.get(name)
+    if source is None:
+        return None
+    return source, None, lambda: True
+
+
+class _BytecodeCache(FileSystemBytecodeCache):
+    def dump_bytecode(self, bucket) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+class _Environment(TrackingEnvironment):
+    def from_cached_string(self, source: str):
+        """Like ``from_string``, but compiled once per distinct source.
+
+        The template is named after the hash of its source, so the bytecode
+        cache lets later builds skip compiling page bodies that did not change.
+        """
+        name = f"{_STRING_PREFIX}{digest(source)}"
+        _strings[name] = source
+        try:
+            # Bypass dependency tracking; the source is the page itself.
+            return Environment.get_template(self, name)
+        finally:
+            del _strings[name]
+
+
+environment = _Environment(
+    loader=ChoiceLoader([FileSystemLoader("templates/"), FunctionLoader(_load_string)]),
+    bytecode_cache=_BytecodeCache(str(pathlib.Path(".geno") / "jinja")),
+)
@@ -0,0 +1,69 @@
+import pathlib
+from typing import Any
+
+import yaml
+
+MARKER = b"---fm---"
+
+
+def read_frontmatter(src: pathlib.Path) -> tuple[dict, int]:
+    """Parse the frontmatter of ``src`` without keeping the body in memory.
+
+    Returns the frontmatter and the byte offset at which the body starts.
+    """
+    lines = []
+    offset = 0
+    with open(src, "rb") as s:
+        for line in s:
+            if (index := line.find(MARKER)) != -1:
+                lines.append(line[:index])
+                frontmatter = yaml.safe_load(_decode(b"".join(lines))) or {}
+                return frontmatter, offset + index + len(MARKER)
+            lines.append(line)
+            offset += len(line)
+    return {}, 0
+
+
+def read_body(src: pathlib.Path, offset: int) -> str:
+    with open(src, "rb") as s:
+        s.seek(offset)
+        return _decode(s.read())
+
+
+def _decode(data: bytes) -> str:
+    return data.decode().replace("\r\n", "\n").replace("\r", "\n")
+
+
+class FrontmatterPage:
+    """A page whose source starts with YAML frontmatter.
+
+    Only the frontmatter is kept in memory and its keys read as attributes
+    of the page, the body is read from disk on every access.
+    """
+
+    def __init__(
+        self,
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        root: pathlib.Path | None = None,
+    ):
+        self.src = src
+        self.dst = dst
+        self.link = dst.relative_to(root or dst.parts[0])
+        self.frontmatter, self._offset = read_frontmatter(src)
+
+    @property
+    def body(self) -> str:
+        return read_body(self.src, self._offset)
+
+    @property
+    def outputs(self) -> list[pathlib.Path]:
+        return [self.dst]
+
+    def __getitem__(self, key) -> Any:
+        return self.frontmatter.get(key, None)
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return self[key]
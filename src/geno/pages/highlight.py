@@ -0,0 +1,86 @@
+import functools
+import pathlib
+
+from .. import dependencies
+from ..assets import write_once
+from ..manifest import digest
+
+
+def _hilite(code: str, lang: str) -> str:
+    # The highlighter Panel's Markdown pane uses, so cached and uncached
+    # pages are identical.
+    try:
+        from markdown.extensions.codehilite import CodeHilite
+
+        return CodeHilite(src=code, lang=lang).hilite()
+    except Exception:
+        return code
+
+
+class HighlightCache:
+    """Highlighted code blocks on disk, keyed by their language and source.
+
+    The markup only refers to Pygments token classes, so the style is left to
+    the stylesheet and a new Pygments or Markdown release starts afresh.
+    Pages record the blocks they read, and blocks no page records any more
+    are pruned.
+    """
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+
+    @functools.cached_property
+    def version(self) -> str:
+        import markdown
+        import pygments
+
+        return f"pygments {pygments.__version__} markdown {markdown.__version__}"
+
+    def highlight(self, code: str, lang: str, attrs: str = "") -> str:
+        key = digest(self.version, lang, code)
+        path = self.directory / key[:2] / f"{key}.html"
+        dependencies.record(f"highlight:{key}")
+        try:
+            return path.read_text()
+        except FileNotFoundError:
+            html = _hilite(code, lang)
+            write_once(path, html.encode())
+            return html
+
+    def prune(self, manifest) -> int:
+        """Remove the blocks no page of ``manifest`` reads, return how many."""
+        used = {
+            key.removeprefix("highlight:")
+            for entry in manifest.pages.values()
+            for key in entry["dependencies"]
+            if key.startswith("highlight:")
+        }
+        pruned = 0
+        for path in self.directory.glob("*/*.html"):
+            if path.stem not in used:
+                path.unlink()
+                pruned += 1
+                if not any(path.parent.iterdir()):
+                    path.parent.rmdir()
+        return pruned
+
+
+_cache = HighlightCache(pathlib.Path(".geno") / "highlight")
+
+
+def prune(manifest) -> int:
+    """Remove the cached blocks no page of ``manifest`` reads."""
+    return _cache.prune(manifest)
+
+
+def _fence(self, tokens, idx, options, env) -> str:
+    from markdown_it.renderer import RendererHTML
+    from markdown_it.utils import OptionsDict
+
+    options = OptionsDict({**options, "highlight": _cache.highlight})
+    return RendererHTML.fence(self, tokens, idx, options, env)
+
+
+def cached_highlighting(md) -> None:
+    """markdown-it plugin highlighting fenced code through the on-disk cache."""
+    md.add_render_rule("fence", _fence)
@@ -1,45 +1,25 @@
-import pathlib
-from typing import Any
+from .environment import environment
+from .frontmatter import FrontmatterPage
+from .highlight import cached_highlighting
 
-import panel as pn
-import yaml
-from jinja2 import Environment, FileSystemLoader
 
-
-environment = Environment(loader=FileSystemLoader("templates/"))
-
-
-class MarkdownPage:
-    def __init__(
-        self,
-        src: pathlib.Path,
-        dst: pathlib.Path,
-    ):
-        self.src = src
-        self.dst = dst
-        self.link = dst.relative_to(dst.parts[0])
-
-        with open(src) as s:
-            self.markdown = s.read()
-            self.frontmatter = {}
-
-        if "---fm---" in self.markdown:
-            frontmatter, self.markdown = self.markdown.split("---fm---", 1)
-            self.frontmatter = yaml.safe_load(frontmatter)
+class MarkdownPage(FrontmatterPage):
+    markdown = FrontmatterPage.body
 
     def render(
         self,
         site,
         stylesheets,
+        **context,
     ):
-        template = environment.get_template(self.frontmatter.get("layout", "default"))
-        markdown = template.render(
-            content=self.markdown, page=self.frontmatter, site=site
-        )
+        import panel as pn
+
+        body = environment.from_cached_string(self.markdown)
+        body = body.render(page=self.frontmatter, site=site, **context)
 
-        template = environment.from_string(markdown)
+        template = environment.get_template(self.frontmatter.get("layout", "default"))
         markdown = template.render(
-            content=self.markdown, page=self.frontmatter, site=site
+            content=body, page=self.frontmatter, site=site, **context
         )
 
         return pn.pane.Markdown(
@@ -48,10 +28,5 @@ class MarkdownPage:
             sizing_mode="stretch_width",
             align="center",
             stylesheets=stylesheets,
+            plugins=[cached_highlighting],
         )
-
-    def __getitem__(self, key) -> Any:
-        return self.frontmatter.get(key, None)
-
-    def __getattr__(self, key):
-        return self[key]
@@ -0,0 +1,121 @@
+import pathlib
+from collections.abc import Mapping
+
+from ..dependencies import record
+from .markdown import MarkdownPage
+
+
+def collection(section: str, number: int) -> str:
+    """The name of the slice of ``section`` listed on page ``number``."""
+    return f"{section}:{number}"
+
+
+def find_listing(pages, content: pathlib.Path, section: str) -> MarkdownPage | None:
+    """The page listing ``section``, content/<section>.md or its index.md."""
+    names = (section, f"{section}/index")
+    for page in pages:
+        if not isinstance(page, MarkdownPage) or not page.src.is_relative_to(content):
+            continue
+        if page.src.relative_to(content).with_suffix("").as_posix() in names:
+            return page
+    return None
+
+
+def page_link(listing: MarkdownPage, number: int) -> pathlib.Path:
+    """Where page ``number`` of a listing is published, relative to static/."""
+    if number == 1:
+        return listing.link
+    base = listing.link.parent if listing.link.name == "index.html" else listing.link
+    return base.with_suffix("") / "page" / f"{number}.html"
+
+
+class _Pages(Mapping):
+    def __init__(self, pages, aliases: dict) -> None:
+        self._pages = pages
+        self._aliases = aliases
+
+    def __getitem__(self, name):
+        return self._pages[self._aliases.get(name, name)]
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        return iter(self._pages)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+class _Site(Mapping):
+    """The site model as seen by one page of a listing: its section only
+    holds the pages listed there."""
+
+    def __init__(self, site, aliases: dict) -> None:
+        self._site = site
+        self._aliases = aliases
+
+    def __getitem__(self, key):
+        if key == "pages":
+            return _Pages(self._site["pages"], self._aliases)
+        return self._site[key]
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __iter__(self):
+        return iter(self._site)
+
+    def __len__(self) -> int:
+        return len(self._site)
+
+
+class PaginatedPage(MarkdownPage):
+    """One page of a section listing, e.g. blog.md split every 10 posts.
+
+    Templates iterate ``site.pages.<section>`` as usual and only see the pages
+    of this slice, so a page is only rendered again when its own slice
+    changed. ``paginator`` links the pages of the listing together and names
+    their ``collection``.
+    """
+
+    def __init__(
+        self,
+        listing: MarkdownPage,
+        root: pathlib.Path,
+        section: str,
+        number: int,
+        total: int,
+    ) -> None:
+        self.src = listing.src
+        self.dst = root / page_link(listing, number)
+        self.link = page_link(listing, number)
+        self.frontmatter = listing.frontmatter
+        self._offset = listing._offset
+        self._collection = section
+        self.number = number
+        self.paginator = {
+            "collection": section,
+            "number": number,
+            "total": total,
+            "first": f"/{page_link(listing, 1).as_posix()}",
+            "last": f"/{page_link(listing, total).as_posix()}",
+            "previous": None,
+            "next": None,
+        }
+        if number > 1:
+            self.paginator["previous"] = f"/{page_link(listing, number - 1).as_posix()}"
+        if number < total:
+            self.paginator["next"] = f"/{page_link(listing, number + 1).as_posix()}"
+
+    def render(self, site, stylesheets, **context):
+        record(f"pagination:{self._collection}")
+        name = collection(self._collection, self.number)
+        site = _Site(site, {self._collection: name})
+        return super().render(site, stylesheets, paginator=self.paginator, **context)
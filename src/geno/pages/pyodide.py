@@ -1,14 +1,13 @@
 import importlib.util
+import json
+import multiprocessing
 import pathlib
-import shutil
-import subprocess
 import sys
-from typing import Any
 
-import yaml
-from jinja2 import Environment, FileSystemLoader
-
-environment = Environment(loader=FileSystemLoader("templates/"))
+from .. import profile
+from .environment import environment
+from .frontmatter import FrontmatterPage
+from .reproducible import canonical_ids, stable_ids
 
 
 def load_module_from_path(module_path):
@@ -19,38 +18,56 @@ def load_module_from_path(module_path):
     return module
 
 
-class PyodidePage:
-    def __init__(
-        self,
-        src: pathlib.Path,
-        dst: pathlib.Path,
-    ):
-        self.src = src
-        self.dst = dst
-        self.link = dst.relative_to(dst.parts[0])
-
-        with open(src) as s:
-            self.app = s.read()
-            self.frontmatter = {}
+class PyodidePage(FrontmatterPage):
+    app = FrontmatterPage.body
 
-        if "---fm---" in self.app:
-            frontmatter, self.app = self.app.split("---fm---", 1)
-            self.frontmatter = yaml.safe_load(frontmatter)
+    @property
+    def outputs(self) -> list[pathlib.Path]:
+        return [self.dst, self.dst.with_suffix(".js"), self.dst.with_suffix(".py")]
 
     def render(self, site, stylesheets):
-        template = environment.from_string(self.app)
+        """Write the templated app next to its destination, ready for `convert`."""
+        template = environment.from_cached_string(self.app)
         app = template.render(
             content=self.markdown, page=self.frontmatter, site=site, css=stylesheets
         )
         with open(self.dst.with_suffix(".py"), "w") as t:
             t.write(app)
 
-        subprocess.run(
-            f"panel convert {self.dst.with_suffix('.py')} --to pyodide-worker --out {self.dst.parent}".split()
-        )
 
-    def __getitem__(self, key) -> Any:
-        return self.frontmatter.get(key, None)
+def convert(pages, trace: pathlib.Path | None = None) -> multiprocessing.Process:
+    """Convert rendered pages to Pyodide workers in one background process.
+
+    Panel and the app dependencies are loaded once for the whole batch, and
+    the caller is free to keep rendering while the conversion runs. With
+    ``trace`` the process profiles every app and writes the events there.
+    """
+    apps = []
+    for page in pages:
+        page.dst.unlink(missing_ok=True)
+        page.dst.with_suffix(".js").unlink(missing_ok=True)
+        apps.append((str(page.src), page.dst.with_suffix(".py")))
+    process = multiprocessing.Process(target=_convert_apps, args=(apps, trace))
+    process.start()
+    return process
+
+
+def _convert_apps(apps: list[tuple[str, pathlib.Path]], trace) -> None:
+    if trace is not None:
+        profile.start()
+    with profile.span("import panel.io.convert", "convert"):
+        from panel.io.convert import convert_app
 
-    def __getattr__(self, key):
-        return self[key]
+    failed = 0
+    for src, app in apps:
+        with profile.span(f"convert {src}", "page", src=src), stable_ids(str(app)):
+            result = convert_app(app, app.parent, runtime="pyodide-worker")
+        if result is None:
+            failed += 1
+            continue
+        html = app.with_suffix(".html")
+        html.write_text(canonical_ids(html.read_text()))
+    if trace is not None:
+        trace.write_text(json.dumps(profile.drain()))
+    if failed:
+        sys.exit(1)
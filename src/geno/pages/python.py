@@ -1,2 +1,181 @@
-class PythonPage:
-    pass
+import concurrent.futures
+import importlib.metadata
+import pathlib
+import shutil
+import subprocess
+import sys
+
+from .. import dependencies
+from ..manifest import digest, load_state, parse_size, save_state
+from .environment import environment
+from .frontmatter import FrontmatterPage
+from .reproducible import canonical_ids, stable_ids
+
+
+class PythonPage(FrontmatterPage):
+    """A Python page run once at build time and published as static HTML.
+
+    ``mode: static`` in the frontmatter of a .py page selects it instead of
+    a Pyodide worker: readers get the saved app without downloading an
+    interpreter. With ``embed: true`` widget states are embedded so simple
+    widgets keep working. Files the app reads are listed as globs under
+    ``data`` so changing them runs the page again.
+    """
+
+    app = FrontmatterPage.body
+
+    @property
+    def data(self) -> list[str]:
+        data = self.frontmatter.get("data") or []
+        return [data] if isinstance(data, str) else list(data)
+
+    def render(self, site, stylesheets) -> str:
+        """The templated app, ready for `Snapshots`."""
+        for pattern in self.data:
+            dependencies.record(f"data:{pattern}")
+        template = environment.from_cached_string(self.app)
+        return template.render(
+            content=self.markdown, page=self.frontmatter, site=site, css=stylesheets
+        )
+
+
+class Snapshots:
+    """Run ``PythonPage`` apps in worker processes, in the background.
+
+    Each app runs in a fresh interpreter, killed after ``timeout`` seconds
+    and limited to ``memory`` bytes of address space, so a runaway page
+    fails alone. Snapshots are cached under ``cache`` by the digest of the
+    templated app, its title, source, data files and the Panel and Bokeh
+    versions, and pruned once no page uses them.
+    """
+
+    def __init__(self, cache: pathlib.Path, settings, jobs: int) -> None:
+        self.cache = cache
+        self.timeout = settings.get("timeout", 300)
+        self.memory = parse_size(settings.get("memory", 0))
+        self.executed = 0
+        self.restored = 0
+        self.pruned = 0
+        self.state_path = cache / "pages.json"
+        self.pages = load_state(self.state_path, {})
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+        self._futures = {}
+        self._versions = [
+            importlib.metadata.version("panel"),
+            importlib.metadata.version("bokeh"),
+        ]
+
+    def start(self, key, page: PythonPage, app: str) -> None:
+        """Snapshot ``page`` from ``app``, its templated source."""
+        parts = [
+            app,
+            str(page.title or page.src.stem),
+            str(page.src),
+            str(bool(page.embed)),
+            *self._versions,
+        ]
+        for pattern in page.data:
+            for path in dependencies.data_files(pattern):
+                parts += [str(path), path.read_bytes()]
+        name = digest(*parts)
+        cached = self.cache / name[:2] / f"{name}.html"
+        self.pages[str(page.src)] = name
+        self._futures[key] = self._executor.submit(self._run, page, app, cached)
+
+    def _run(self, page: PythonPage, app: str, cached: pathlib.Path) -> str | None:
+        if cached.exists():
+            self.restored += 1
+        else:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            script = cached.with_suffix(".py")
+            script.write_text(app)
+            tmp = cached.with_name(f".{cached.stem}.tmp.html")
+            timeout = page.timeout or self.timeout
+            memory = parse_size(page.memory) if page.memory else self.memory
+            command = [
+                sys.executable,
+                "-m",
+                __name__,
+                str(script),
+                str(tmp),
+                str(page.src),
+                str(page.title or page.src.stem),
+                "1" if page.embed else "0",
+                str(memory),
+            ]
+            try:
+                result = subprocess.run(
+                    command, capture_output=True, text=True, timeout=timeout
+                )
+            except subprocess.TimeoutExpired:
+                tmp.unlink(missing_ok=True)
+                return f"{page.src}:\nsnapshot timed out after {timeout} seconds\n"
+            finally:
+                script.unlink(missing_ok=True)
+            if result.returncode:
+                tmp.unlink(missing_ok=True)
+                return f"{page.src}:\n{result.stderr}"
+            tmp.replace(cached)
+            self.executed += 1
+        page.dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cached, page.dst)
+        return None
+
+    def join(self) -> dict:
+        """Wait for every snapshot, returning the errors by key."""
+        errors = {}
+        for key, future in self._futures.items():
+            if (error := future.result()) is not None:
+                errors[key] = error
+        self._executor.shutdown()
+        return errors
+
+    def prune(self, pages) -> None:
+        """Remove the snapshots none of ``pages`` was last built from."""
+        sources = {str(page.src) for page in pages}
+        self.pages = {src: name for src, name in self.pages.items() if src in sources}
+        names = set(self.pages.values())
+        for path in self.cache.glob("*/*.html"):
+            if path.stem not in names:
+                path.unlink()
+                self.pruned += 1
+                if not any(path.parent.iterdir()):
+                    path.parent.rmdir()
+        save_state(self.state_path, self.pages)
+
+
+def _snapshot(script: str, output: str, seed: str, title: str, embed: bool, memory):
+    """Run ``script`` and save what it marks servable to ``output``."""
+    if memory:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    import runpy
+
+    import panel as pn
+    from panel.template.base import BaseTemplate
+    from panel.viewable import ServableMixin
+
+    servables = []
+
+    def servable(self, *args, **kwargs):
+        servables.append(self)
+        return self
+
+    ServableMixin.servable = BaseTemplate.servable = servable
+    # Apps may import modules kept next to them.
+    sys.path.insert(0, str(pathlib.Path(seed).parent))
+    with stable_ids(seed):
+        runpy.run_path(script, run_name="__main__")
+        if not servables:
+            sys.exit(f"{seed} has no servable objects")
+        app = servables[0] if len(servables) == 1 else pn.Column(*servables)
+        app.save(output, embed=embed, title=title)
+    path = pathlib.Path(output)
+    path.write_text(canonical_ids(path.read_text()))
+
+
+if __name__ == "__main__":
+    script, output, seed, title, embed, memory = sys.argv[1:]
+    _snapshot(script, output, seed, title, embed == "1", int(memory))
@@ -0,0 +1,94 @@
+import contextlib
+import itertools
+import random
+import re
+import types
+import uuid
+
+
+@contextlib.contextmanager
+def stable_ids(seed: str):
+    """Derive the Bokeh document and element uuids from ``seed``."""
+    from bokeh.util import serialization
+
+    rng = random.Random(seed)
+    previous = serialization.uuid
+    serialization.uuid = types.SimpleNamespace(
+        uuid4=lambda: uuid.UUID(int=rng.getrandbits(128), version=4)
+    )
+    try:
+        yield
+    finally:
+        serialization.uuid = previous
+
+
+# Identifiers in a saved document that depend on what the process rendered
+# before it. They are only rewritten where Bokeh and Panel write them, never
+# wherever a string looks like one, so the data of an app is left alone.
+
+# ``id()`` of the Python objects naming template roots and js callbacks.
+_OBJECT_IDS = re.compile(
+    r'(?:"name":"(?P<root>main|nav|header|modal)-|'
+    r'"name":"CustomJS","id":"p\d+","attributes":\{"tags":\[\[)'
+    r'(?P<id>\d+)(?(root)","tags":\["(?P=root)"\]|,)'
+)
+# param's global instance counter, in the names it gives objects, e.g.
+# Column01001.
+_AUTOMATIC_NAMES = re.compile(
+    r'"attributes":\{"name":"(?P<cls>[A-Za-z_]\w*?)(?P<id>\d{5})"'
+)
+# Bokeh's global model counter, in model definitions and references, and
+# naming the script holding the document of a Pyodide page.
+_MODEL_IDS = re.compile(
+    r'(?:"id":"|"__ref:|data-root-id="|'
+    r'<script type="application/json" id="|getElementById\(\')(?P<id>p\d+)["\']'
+)
+_ROOTS = re.compile(r'"root_ids":\[[^\]]*\]|"roots":\{[^}]*\}')
+
+
+def _parameterized_names() -> set[str]:
+    import param
+
+    names = set()
+    classes = [param.Parameterized]
+    while classes:
+        cls = classes.pop()
+        if cls.__name__ not in names:
+            names.add(cls.__name__)
+            classes += cls.__subclasses__()
+    return names
+
+
+def _renumber(html: str, pattern, fmt: str, keep=None) -> tuple[str, dict]:
+    counter = itertools.count(1000)
+    ids = {}
+
+    def replace(match):
+        if keep is not None and not keep(match):
+            return match[0]
+        old = match["id"]
+        if old not in ids:
+            ids[old] = fmt.format(next(counter))
+        start, end = match.start("id") - match.start(), match.end("id") - match.start()
+        return match[0][:start] + ids[old] + match[0][end:]
+
+    return pattern.sub(replace, html), ids
+
+
+def canonical_ids(html: str) -> str:
+    """Renumber process dependent identifiers in order of first appearance."""
+    html, _ = _renumber(html, _OBJECT_IDS, "{}")
+    names = _parameterized_names()
+    html, _ = _renumber(
+        html, _AUTOMATIC_NAMES, "{:05d}", keep=lambda match: match["cls"] in names
+    )
+    html, ids = _renumber(html, _MODEL_IDS, "p{}")
+
+    def roots(match):
+        return re.sub(
+            r'"(p\d+)"',
+            lambda root: f'"{ids[root[1]]}"' if root[1] in ids else root[0],
+            match[0],
+        )
+
+    return _ROOTS.sub(roots, html)
@@ -0,0 +1,54 @@
+import html
+import json
+import re
+
+PLACEHOLDER = "geno-page-content"
+
+_DOCS_JSON = re.compile(
+    r'(<script type="application/json" id="[^"]*">\s*)(.*?)(\s*</script>)', re.S
+)
+
+
+def _find_placeholder(value):
+    if isinstance(value, dict):
+        attributes = value.get("attributes")
+        if isinstance(attributes, dict) and PLACEHOLDER in str(attributes.get("text")):
+            return attributes
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _find_placeholder(item)
+            if found is not None:
+                return found
+    return None
+
+
+class Shell:
+    """A saved page whose main pane text is filled in for every page.
+
+    Every Markdown page shares the same template, header and navigation, so
+    the document is saved once around a placeholder pane and only the
+    serialized text of that pane changes from page to page.
+    """
+
+    def __init__(self, page: str) -> None:
+        from bokeh.core.json_encoder import serialize_json
+
+        match = _DOCS_JSON.search(page)
+        if match is None:
+            raise ValueError("page has no embedded document")
+        self.head = page[: match.start(2)]
+        self.tail = page[match.end(2) :]
+        self.docs = json.loads(html.unescape(match[2]))
+        self.attributes = _find_placeholder(self.docs)
+        if self.attributes is None:
+            raise ValueError("placeholder pane not found in the document")
+        if html.escape(serialize_json(self.docs), quote=False) != match[2]:
+            raise ValueError("document does not serialize back to the saved page")
+
+    def fill(self, text: str) -> str:
+        from bokeh.core.json_encoder import serialize_json
+
+        self.attributes["text"] = text
+        docs_json = html.escape(serialize_json(self.docs), quote=False)
+        return self.head + docs_json + self.tail
@@ -0,0 +1,74 @@
+import pathlib
+import re
+
+from .markdown import MarkdownPage
+
+TAXONOMIES = ["tags", "sections", "years", "months"]
+
+TITLES = {
+    "tags": "Posts tagged {}",
+    "sections": "{}",
+    "years": "Posts from {}",
+    "months": "Posts from {}",
+}
+
+# The body of a term's page unless templates/<taxonomy> provides one.
+DEFAULT_BODY = """\
+{% for page in pages %}
+- ### [{{ page.date }} {{ page.title }}](/{{ page.link }})
+{% endfor %}
+"""
+
+_DATE = re.compile(r"(\d{4})-(\d{2})")
+
+
+def tags(page) -> list[str]:
+    value = page.tags or []
+    return value.split() if isinstance(value, str) else [str(tag) for tag in value]
+
+
+def section(page, path: pathlib.Path) -> str | None:
+    """The ``section`` of ``page``, or the directory it is published in."""
+    return page.section or (path.parts[0] if len(path.parts) > 1 else None)
+
+
+def terms(page, path: pathlib.Path) -> list[str]:
+    """The taxonomy collections ``page``, published at ``path``, belongs to."""
+    names = [f"tags/{tag}" for tag in tags(page)]
+    if term := section(page, path):
+        names.append(f"sections/{term}")
+    if match := _DATE.match(str(page.date or "")):
+        names += [f"years/{match[1]}", f"months/{match[1]}-{match[2]}"]
+    return names
+
+
+def slug(term: str) -> str:
+    return re.sub(r"[^\w+.-]+", "-", term.lower()).strip("-")
+
+
+class TaxonomyPage(MarkdownPage):
+    """The archive page of one term, e.g. every post tagged python.
+
+    It lists ``site.pages["tags/python"]`` only, so adding a post re-renders
+    the pages of its own tags and dates and nothing else.
+    """
+
+    def __init__(self, taxonomy: str, term: str, root: pathlib.Path) -> None:
+        # There is no source file, the body comes from templates/<taxonomy>.
+        self.src = pathlib.Path("templates") / taxonomy
+        self.link = pathlib.Path(taxonomy) / f"{slug(term)}.html"
+        self.dst = root / self.link
+        self.frontmatter = {"title": TITLES.get(taxonomy, "{}").format(term)}
+        self._offset = 0
+        self.taxonomy = taxonomy
+        self.term = term
+
+    @property
+    def markdown(self) -> str:
+        if self.src.is_file():
+            return self.src.read_text()
+        return DEFAULT_BODY
+
+    def render(self, site, stylesheets, **context):
+        pages = site["pages"][f"{self.taxonomy}/{self.term}"]
+        return super().render(site, stylesheets, term=self.term, pages=pages, **context)
@@ -0,0 +1,144 @@
+import contextlib
+import json
+import os
+import pathlib
+import resource
+import time
+
+_profiler = None
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _reset_peak_rss() -> None:
+    # Linux lets a process reset its own high-water mark; elsewhere the peak
+    # of a span is the peak of the process so far.
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+class Profiler:
+    """Records the wall time and peak resident memory of nested spans.
+
+    Events use the Chrome trace-event format, so a trace can be opened in
+    chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(self) -> None:
+        self.events = []
+        self._peaks = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args):
+        # The kernel only tracks a single peak, so every span resets it and
+        # hands its own peak up to the enclosing span when it finishes.
+        self._peaks.append(0)
+        _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            peak = max(_peak_rss(), self._peaks.pop())
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": 0,
+                    "args": {**args, "peak_memory": peak},
+                }
+            )
+
+    def drain(self) -> list[dict]:
+        events, self.events = self.events, []
+        return events
+
+
+def start() -> Profiler:
+    """Start profiling the current process."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stop() -> None:
+    global _profiler
+    _profiler = None
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "phase", **args):
+    """Time the enclosed block when profiling, and do nothing otherwise."""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.span(name, category, **args):
+        yield
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def drain() -> list[dict]:
+    return [] if _profiler is None else _profiler.drain()
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 2**20:8.1f} MB"
+
+
+def summary(events, slowest: int = 10) -> str:
+    """Format the build phases and the slowest pages of a trace."""
+    lines = ["Phase                              Time     Peak memory"]
+    for event in sorted(events, key=lambda event: event["ts"]):
+        if event["cat"] == "phase" and event["pid"] == os.getpid():
+            lines.append(
+                f"  {event['name']:<28} {event['dur'] / 1e6:8.2f}s "
+                f"{_megabytes(event['args']['peak_memory'])}"
+            )
+
+    pages = {}
+    for event in events:
+        if event["cat"] == "page":
+            src = event["args"]["src"]
+            duration, peak = pages.get(src, (0, 0))
+            pages[src] = (
+                duration + event["dur"],
+                max(peak, event["args"]["peak_memory"]),
+            )
+    if pages:
+        lines.append(f"Slowest pages ({min(slowest, len(pages))} of {len(pages)}):")
+        ranked = sorted(pages.items(), key=lambda item: item[1][0], reverse=True)
+        for src, (duration, peak) in ranked[:slowest]:
+            lines.append(f"  {duration / 1e6:8.2f}s {_megabytes(peak)}  {src}")
+    return "\n".join(lines)
+
+
+def write_trace(events, path: pathlib.Path) -> None:
+    """Write ``events`` as Chrome trace JSON, relative to the first event."""
+    origin = min((event["ts"] for event in events), default=0)
+    trace = [{**event, "ts": event["ts"] - origin} for event in events]
+    trace.sort(key=lambda event: (event["pid"], event["ts"]))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as tf:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, tf, indent=1)
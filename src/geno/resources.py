@@ -0,0 +1,162 @@
+import hashlib
+import os
+import pathlib
+import re
+
+import bokeh
+import panel
+from bokeh.util.paths import bokehjs_path
+from panel.io.resources import CDN_DIST, DIST_DIR
+
+from .assets import file_digest, fingerprinted, write_once
+from .manifest import load_state, save_state
+
+_BOKEH_CDN = "https://cdn.bokeh.org/bokeh/release/"
+
+_CDN_URL = re.compile(
+    f"({re.escape(_BOKEH_CDN)}|{re.escape(CDN_DIST)})" r"""([^"'?\s)]+)(\?v=[\w.]+)?"""
+)
+
+# A published file, its path split around the fingerprint added by
+# ``fingerprinted``.
+_PUBLISHED = re.compile(r"(.+)\.[0-9a-f]{8}(\.[^./]+)?")
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _source(cdn: str, path: str) -> tuple[pathlib.Path, str]:
+    """The installed file behind a CDN URL and where it is published."""
+    if cdn == CDN_DIST:
+        return DIST_DIR / path, f"panel/{panel.__version__}/{path}"
+    name = path.replace(f"-{bokeh.__version__}", "")
+    return pathlib.Path(bokehjs_path()) / "js" / name, f"bokeh/{path}"
+
+
+def local_file(url: str) -> pathlib.Path | None:
+    """The installed copy of a Bokeh or Panel CDN URL, if there is one."""
+    match = _CDN_URL.fullmatch(url)
+    if match is None:
+        return None
+    src, _ = _source(match[1], match[2])
+    return src if src.is_file() else None
+
+
+class SharedResources:
+    """Publishes the Bokeh and Panel files linked by pages under static/.
+
+    Pages link to content-hashed copies of the bundles instead of the CDN,
+    so browsers cache them across pages and deployments of the same version.
+    Files of other Bokeh and Panel versions and earlier site stylesheets are
+    pruned once the build no longer links to them.
+    """
+
+    def __init__(
+        self, static: pathlib.Path, state_path: pathlib.Path, prefix: str = "_geno"
+    ) -> None:
+        self.static = static
+        self.root = static / prefix
+        self.state_path = state_path
+        self.outputs = load_state(state_path, [])
+        self.urls = {}
+        self.site_stylesheet = None
+
+    def _publish_references(self, src: pathlib.Path, dst: pathlib.Path) -> None:
+        """Publish files a stylesheet refers to relative to itself."""
+        for match in _CSS_URL.finditer(src.read_text()):
+            reference = match[2].split("?")[0].split("#")[0]
+            if not reference or re.match(r"^(data:|[a-z]+://|/)", reference):
+                continue
+            source = pathlib.Path(os.path.normpath(src.parent / reference))
+            if source.is_file() and source.is_relative_to(DIST_DIR):
+                target = pathlib.Path(os.path.normpath(dst.parent / reference))
+                write_once(target, source.read_bytes())
+
+    def _url(self, match: re.Match) -> str:
+        if match[0] not in self.urls:
+            src, path = _source(match[1], match[2])
+            if not src.is_file():
+                self.urls[match[0]] = match[0]
+            else:
+                dst = self.root / fingerprinted(path, file_digest(src))
+                write_once(dst, src.read_bytes())
+                if src.suffix == ".css":
+                    self._publish_references(src, dst)
+                self.urls[match[0]] = "/" + dst.relative_to(self.static).as_posix()
+        return self.urls[match[0]]
+
+    def localize(self, page: str) -> str:
+        """Point every Bokeh and Panel CDN link in ``page`` at a local copy."""
+        return _CDN_URL.sub(self._url, page)
+
+    def republish(self, page: pathlib.Path) -> bool:
+        """Publish the files ``page`` links to, for a page restored from a cache.
+
+        Restored pages are not rendered, so the files they link to are only
+        published here. Returns False when one of them cannot be, because
+        the installed Bokeh or Panel no longer provides it.
+        """
+        prefix = "/" + self.root.relative_to(self.static).as_posix() + "/"
+        links = re.finditer(
+            re.escape(prefix) + r"""(bokeh|panel)/([^"'?\s)]+)""",
+            page.read_text(errors="replace"),
+        )
+        for link in links:
+            match = _PUBLISHED.fullmatch(link[2])
+            if match is None:
+                return False
+            path = match[1] + (match[2] or "")
+            if link[1] == "bokeh":
+                url = _BOKEH_CDN + path
+            elif path.startswith(f"{panel.__version__}/"):
+                url = CDN_DIST + path.removeprefix(f"{panel.__version__}/")
+            else:
+                return False
+            if self.localize(url) != link[0]:
+                return False
+        return True
+
+    def stylesheet(self, stylesheets: list[str]) -> str:
+        """Publish the site stylesheets as one file and return its URL."""
+        data = "\n".join(stylesheets).encode()
+        # The stylesheet is named after the Bokeh and Panel versions too, so
+        # upgrading them renders every page again and none link to the
+        # pruned files of the previous versions.
+        versions = f"{bokeh.__version__} {panel.__version__}".encode()
+        digest = hashlib.sha256(data + versions).hexdigest()
+        dst = self.root / fingerprinted("site.css", digest)
+        write_once(dst, data)
+        self.site_stylesheet = dst
+        return "/" + dst.relative_to(self.static).as_posix()
+
+    def _current(self, path: pathlib.Path) -> bool:
+        if path.suffix in (".gz", ".br"):
+            # Compressed copies are current as long as their source is.
+            path = path.with_suffix("")
+        kind, _, name = path.relative_to(self.root).as_posix().partition("/")
+        if kind == "panel":
+            return name.startswith(f"{panel.__version__}/")
+        if kind == "bokeh":
+            return f"-{bokeh.__version__}" in name
+        return path == self.site_stylesheet
+
+    def update(self) -> list[pathlib.Path]:
+        """Record the published files and return the stale ones."""
+        files = sorted(path for path in self.root.rglob("*") if path.is_file())
+        outputs = [str(path) for path in files if self._current(path)]
+        removed = set(self.outputs) | {str(path) for path in files}
+        removed -= set(outputs)
+        self.outputs = outputs
+        save_state(self.state_path, self.outputs)
+        return [pathlib.Path(output) for output in sorted(removed)]
+
+    def clear(self) -> list[pathlib.Path]:
+        """Forget every published file and return them, for ``shared: false``."""
+        removed = [pathlib.Path(output) for output in self.outputs]
+        self.outputs = []
+        self.state_path.unlink(missing_ok=True)
+        return removed
+
+    def size(self) -> tuple[int, int]:
+        """Number and total size of the published files."""
+        files = [path for path in self.root.rglob("*") if path.is_file()]
+        return len(files), sum(path.stat().st_size for path in files)
@@ -0,0 +1,192 @@
+import collections
+import json
+import pathlib
+import re
+import unicodedata
+
+from .manifest import digest, load_state, save_state
+from .pages import MarkdownPage, PaginatedPage, TaxonomyPage
+
+_STOPWORDS = set(
+    "a an and are as at be but by for from has have if in into is it its of on "
+    "or so that the their then there these this to was were will with you your".split()
+)
+
+# Fenced code, template tags and markup are not worth searching.
+_NOISE = re.compile(r"```.*?```|\{[{%#].*?[}%#]\}|<[^>]+>|\(\s*[^)\s]*\)", re.S)
+
+_CLIENT = """\
+// Client for the search index written by geno. Only the shards holding the
+// query terms are fetched, e.g. genoSearch("pythonic c++").then(console.log)
+const genoSearch = (() => {
+  const root = new URL(".", document.currentScript.src).pathname;
+  const cache = {};
+  const load = (name) =>
+    (cache[name] ??= fetch(`${root}${name}.json`).then((r) => (r.ok ? r.json() : {})));
+  // The words left out of the index, which no page would match.
+  const stopwords = new Set(STOPWORDS);
+  const tokenize = (text) =>
+    (text.normalize("NFKD").replace(/[\\u0300-\\u036f]/g, "").toLowerCase()
+      .match(/[a-z0-9]+/g) ?? []).filter((t) => t.length > 1 && !stopwords.has(t));
+
+  return async (query) => {
+    const terms = tokenize(query);
+    const pages = await load("pages");
+    let scores = null;
+    for (const [i, term] of terms.entries()) {
+      const shard = await load(term.slice(0, pages.prefix));
+      // The last term also matches as a prefix, so results show while typing.
+      const matches = Object.keys(shard).filter((t) =>
+        i === terms.length - 1 ? t.startsWith(term) : t === term);
+      const found = new Map();
+      for (const t of matches)
+        for (const [id, count] of shard[t]) found.set(id, (found.get(id) ?? 0) + count);
+      scores = scores === null ? found
+        : new Map([...scores].filter(([id]) => found.has(id))
+                             .map(([id, s]) => [id, s + found.get(id)]));
+    }
+    return [...(scores ?? [])]
+      .sort((a, b) => b[1] - a[1])
+      .map(([id, score]) => ({ ...pages.pages[id], score }));
+  };
+})();
+""".replace("STOPWORDS", json.dumps(sorted(_STOPWORDS)))
+
+
+def tokenize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return [
+        token
+        for token in re.findall(r"[a-z0-9]+", text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def _terms(page) -> dict[str, int]:
+    text = [str(page.title or ""), str(page.tags or "")]
+    if isinstance(page, MarkdownPage):
+        text.append(_NOISE.sub(" ", page.markdown))
+    return dict(collections.Counter(tokenize(" ".join(text))))
+
+
+class SearchIndex:
+    """An inverted index of the site, sharded by term prefix for the browser.
+
+    Every page is only tokenized again when its source changed, and only the
+    shards holding terms of changed pages are written again.
+    """
+
+    def __init__(self, state_path: pathlib.Path, prefix: int = 2) -> None:
+        self.state_path = state_path
+        self.state = {"prefix": prefix, "next_id": 0, "pages": {}, "shards": []}
+        state = load_state(state_path, {})
+        if state.get("prefix") == prefix:
+            self.state = state
+        self.stats = {}
+
+    def _shard(self, term: str) -> str:
+        return term[: self.state["prefix"]]
+
+    def update(self, pages, output: pathlib.Path) -> list[pathlib.Path]:
+        """Index ``pages`` into ``output`` and return the files that went away."""
+        entries = self.state["pages"]
+        dirty = set()
+        changed = False
+        current = set()
+        for page in pages:
+            # Later pages of a listing share its source, and archive pages
+            # only repeat the titles of other pages.
+            if isinstance(page, TaxonomyPage):
+                continue
+            if isinstance(page, PaginatedPage) and page.number > 1:
+                continue
+            src = str(page.src)
+            current.add(src)
+            source = digest(page.src.read_bytes())
+            entry = entries.get(src)
+            if entry is not None and entry["digest"] == source:
+                continue
+            changed = True
+            terms = _terms(page)
+            if entry is not None:
+                dirty.update(map(self._shard, entry["terms"]))
+            dirty.update(map(self._shard, terms))
+            entries[src] = {
+                "id": entry["id"] if entry else self.state["next_id"],
+                "digest": source,
+                "link": f"/{page.link.as_posix()}",
+                "title": str(page.title or page.link.stem),
+                "tags": str(page.tags or "").split(),
+                "terms": terms,
+            }
+            if entry is None:
+                self.state["next_id"] += 1
+        for src in set(entries) - current:
+            changed = True
+            dirty.update(map(self._shard, entries.pop(src)["terms"]))
+        # Outputs lost since the last build, e.g. to --force, are written again.
+        dirty.update(
+            shard
+            for shard in self.state["shards"]
+            if not (output / f"{shard}.json").exists()
+        )
+        changed = changed or not (output / "pages.json").exists()
+
+        output.mkdir(parents=True, exist_ok=True)
+        postings = collections.defaultdict(lambda: collections.defaultdict(list))
+        for entry in sorted(entries.values(), key=lambda entry: entry["id"]):
+            for term, count in entry["terms"].items():
+                if self._shard(term) in dirty:
+                    postings[self._shard(term)][term].append([entry["id"], count])
+        removed = []
+        for shard in sorted(dirty):
+            path = output / f"{shard}.json"
+            if shard in postings:
+                _write_json(path, dict(sorted(postings[shard].items())))
+            else:
+                removed.append(path)
+        shards = {
+            self._shard(term) for entry in entries.values() for term in entry["terms"]
+        }
+        self.state["shards"] = sorted(shards)
+
+        if changed:
+            _write_json(
+                output / "pages.json",
+                {
+                    "prefix": self.state["prefix"],
+                    "pages": {
+                        entry["id"]: {
+                            key: entry[key] for key in ("link", "title", "tags")
+                        }
+                        for entry in entries.values()
+                    },
+                },
+            )
+        client = output / "search.js"
+        if not client.exists() or client.read_text() != _CLIENT:
+            client.write_text(_CLIENT)
+
+        save_state(self.state_path, self.state)
+
+        files = [output / f"{shard}.json" for shard in shards]
+        files.append(output / "pages.json")
+        self.stats = {
+            "terms": len(
+                {term for entry in entries.values() for term in entry["terms"]}
+            ),
+            "shards": len(shards),
+            "written": len(dirty) - len(removed),
+            "size": sum(path.stat().st_size for path in files),
+        }
+        return removed
+
+    def clear(self, output: pathlib.Path) -> list[pathlib.Path]:
+        """Forget the index and return every file it wrote."""
+        shards = [output / f"{shard}.json" for shard in self.state["shards"]]
+        self.state_path.unlink(missing_ok=True)
+        return shards + [output / "pages.json", output / "search.js"]
+
+
+def _write_json(path: pathlib.Path, data) -> None:
+    path.write_text(json.dumps(data, separators=(",", ":"), sort_keys=True))
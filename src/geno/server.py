@@ -0,0 +1,252 @@
+import collections
+import functools
+import html
+import json
+import pathlib
+import threading
+import time
+import traceback
+
+import flask
+import yaml
+
+from . import dependencies, images
+from .__version__ import __version__
+from .assets import Assets
+from .generator import CSS, SHELL_CONFIGURATION, discover, render_template
+from .index import SiteIndex
+from .pages import MarkdownPage, PythonPage, convert, register_global
+from .pages.python import Snapshots
+
+_LIVE_RELOAD = """
+<script>
+  new EventSource("/__geno/events").onmessage = (event) => {
+    const links = JSON.parse(event.data);
+    const link = location.pathname.replace(/^\\//, "") || "index.html";
+    if (links.includes("*") || links.includes(link)) location.reload();
+  };
+</script>
+"""
+
+
+_RELOAD_ON_ANY_CHANGE = """
+<script>
+  new EventSource("/__geno/events").onmessage = () => location.reload();
+</script>
+"""
+
+
+class PageCache:
+    """A bounded LRU of rendered pages and the dependencies they were built from."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries = collections.OrderedDict()
+
+    def get(self, link: str):
+        entry = self.entries.get(link)
+        if entry is not None:
+            self.entries.move_to_end(link)
+        return entry
+
+    def put(self, link: str, page, body, dependencies: dict) -> None:
+        self.entries[link] = (page, body, dependencies)
+        self.entries.move_to_end(link)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, inputs) -> list[str]:
+        """Drop every entry whose dependencies changed and return their links."""
+        stale = [
+            link
+            for link, (page, _, recorded) in self.entries.items()
+            if inputs.values(recorded, page.src) != recorded
+        ]
+        for link in stale:
+            del self.entries[link]
+        return stale
+
+    def clear(self) -> list[str]:
+        self.entries.clear()
+        return ["*"]
+
+
+def _snapshot(paths) -> dict[str, int]:
+    mtimes = {}
+    for path in paths:
+        files = path.rglob("*") if path.is_dir() else [path]
+        for file in files:
+            if "__pycache__" not in file.parts and file.is_file():
+                mtimes[str(file)] = file.stat().st_mtime_ns
+    return mtimes
+
+
+class Server:
+    """Renders pages on request and tells open tabs when they go stale."""
+
+    def __init__(self, configuration_path: pathlib.Path, cache_size: int) -> None:
+        self.configuration_path = configuration_path
+        self.root = pathlib.Path(".geno") / "serve"
+        self.cache = PageCache(cache_size)
+        self.lock = threading.RLock()
+        self.changed = threading.Condition()
+        self.generation = 0
+        self.stale = []
+        self._load()
+
+    def _load(self) -> None:
+        with open(self.configuration_path) as cf:
+            self.configuration = yaml.safe_load(cf)
+        self.css = CSS(
+            pathlib.Path("assets") / "css", self.configuration.get("highlight_style")
+        )
+        self.assets = Assets(self.root / "assets.json")
+        register_global("asset", self.assets.url)
+        register_global("picture", functools.partial(images.picture, self.assets))
+        self.index = SiteIndex(pathlib.Path(".geno") / "site.db")
+        register_global("query", self.index.query)
+        self.template = render_template(self.configuration, self.css.stylesheets)
+        self._discover()
+
+    def _discover(self) -> None:
+        self.site = discover(self.configuration, pathlib.Path("content"), self.root)
+        self.index.update(self.site["pages"]["all"])
+        self.pages = {str(page.link): page for page in self.site["pages"]["all"]}
+        self.inputs = dependencies.Inputs(
+            self.configuration,
+            self.css.stylesheets,
+            self.site,
+            self.assets,
+            __version__,
+            self.index,
+        )
+
+    def _render(self, page):
+        with dependencies.recording() as recorder:
+            site = recorder.site(self.site)
+            if isinstance(page, MarkdownPage):
+                recorder.keys.update(SHELL_CONFIGURATION)
+                body = self.template.html(
+                    page, site, self.css.stylesheets, sidebar_width=140
+                )
+                body = body.replace("</body>", _LIVE_RELOAD + "</body>", 1)
+            elif isinstance(page, PythonPage):
+                snapshots = Snapshots(
+                    pathlib.Path(".geno") / "snapshots",
+                    self.configuration.get("python", {}),
+                    jobs=1,
+                )
+                snapshots.start(page.src, page, page.render(site, self.css.stylesheets))
+                error = snapshots.join().get(page.src)
+                if error is not None:
+                    raise RuntimeError(error)
+                body = page.dst.read_text().replace(
+                    "</body>", _LIVE_RELOAD + "</body>", 1
+                )
+            else:
+                page.dst.parent.mkdir(parents=True, exist_ok=True)
+                page.render(site, self.css.stylesheets)
+                conversion = convert([page])
+                conversion.join()
+                body = page.dst.read_text().replace(
+                    "</body>", _LIVE_RELOAD + "</body>", 1
+                )
+        return body, self.inputs.values(recorder.keys, page.src)
+
+    def page(self, link: str):
+        with self.lock:
+            page = self.pages.get(link)
+            if page is None:
+                return None
+            entry = self.cache.get(link)
+            if entry is None:
+                body, recorded = self._render(page)
+                self.cache.put(link, page, body, recorded)
+                return body
+            return entry[1]
+
+    def watch(self, interval: float = 0.25) -> None:
+        configuration = [self.configuration_path, pathlib.Path("assets") / "css"]
+        sources = [pathlib.Path("content"), pathlib.Path("templates")]
+        before = _snapshot(configuration), _snapshot(sources)
+        while True:
+            time.sleep(interval)
+            after = _snapshot(configuration), _snapshot(sources)
+            if after == before:
+                continue
+            with self.lock:
+                if after[0] != before[0]:
+                    self._load()
+                    stale = self.cache.clear()
+                else:
+                    self._discover()
+                    stale = self.cache.invalidate(self.inputs)
+                    # Open tabs may show pages that already left the cache.
+                    changed = {
+                        path
+                        for path in before[1].keys() | after[1].keys()
+                        if before[1].get(path) != after[1].get(path)
+                    }
+                    stale += [
+                        link
+                        for link, page in self.pages.items()
+                        if str(page.src) in changed and link not in stale
+                    ]
+            before = after
+            with self.changed:
+                self.generation += 1
+                self.stale = stale or ["*"]
+                self.changed.notify_all()
+
+    def events(self):
+        generation = self.generation
+        while True:
+            with self.changed:
+                self.changed.wait_for(lambda: self.generation != generation)
+                generation = self.generation
+                stale = self.stale
+            yield f"data: {json.dumps(stale)}\n\n"
+
+    def app(self) -> flask.Flask:
+        app = flask.Flask(__name__)
+
+        @app.route("/__geno/events")
+        def events():
+            return flask.Response(self.events(), mimetype="text/event-stream")
+
+        @app.route("/favicon.ico")
+        def favicon():
+            return flask.send_file(
+                pathlib.Path(self.configuration["favicon"]).resolve()
+            )
+
+        @app.route("/assets/<path:path>")
+        def assets(path):
+            return flask.send_from_directory(pathlib.Path("assets").resolve(), path)
+
+        @app.route("/", defaults={"path": "index.html"})
+        @app.route("/<path:path>")
+        def page(path):
+            try:
+                body = self.page(path)
+                if body is None:
+                    body = self.page(f"{path.rstrip('/')}.html")
+            except Exception:
+                error = html.escape(traceback.format_exc())
+                return f"<pre>{error}</pre>{_RELOAD_ON_ANY_CHANGE}", 500
+            if body is not None:
+                return body
+            return flask.send_from_directory(self.root.resolve(), path)
+
+        return app
+
+
+def run(
+    configuration_path: pathlib.Path,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache_size: int = 128,
+) -> None:
+    server = Server(configuration_path, cache_size)
+    threading.Thread(target=server.watch, daemon=True).start()
+    server.app().run(host=host, port=port, threaded=True)
@@ -0,0 +1,182 @@
+import fnmatch
+import json
+import pathlib
+import re
+
+from .manifest import load_state, parse_size, save_state
+
+_STYLE = re.compile(rb"<style\b[^>]*>(.*?)</style>", re.S | re.I)
+_SCRIPT = re.compile(rb"<script\b([^>]*)>(.*?)</script>", re.S | re.I)
+_LINK = re.compile(rb"<link\b[^>]*>", re.I)
+_ATTRIBUTE = r"""\b{}\s*=\s*["']([^"']+)["']"""
+# Stylesheets Bokeh loads at runtime are only named in the document JSON.
+_IMPORTED = re.compile(rb'"ImportedStyleSheet"[^}]*?"url":"([^"]+)"')
+_WORKER = re.compile(rb"""new Worker\(\s*["']([^"']+)["']""")
+_MICROPIP = re.compile(r"micropip\.install\(\[([^\]]*)\]")
+_BUNDLE = re.compile(r'_geno_bundle = "([^"]+)"')
+_LOAD_PACKAGE = re.compile(r"""loadPackage\(\s*["']([^"']+)["']""")
+
+METRICS = ["total", "html", "inline_css", "inline_js", "inline_data", "linked"]
+
+
+def _attribute(tag: bytes, name: str) -> str | None:
+    match = re.search(_ATTRIBUTE.format(name), tag.decode(errors="replace"), re.I)
+    return match[1] if match else None
+
+
+def _packages(worker: pathlib.Path) -> list[str]:
+    """The Python packages a Pyodide worker downloads before running."""
+    if not worker.is_file():
+        return []
+    script = worker.read_text()
+    requirements = []
+    if bundle := _BUNDLE.search(script):
+        # Workers sharing a bundle install all of its requirements.
+        path = worker.parent / bundle[1]
+        if path.is_file():
+            requirements = json.loads(path.read_text())["requirements"]
+    else:
+        for match in _MICROPIP.finditer(script):
+            requirements += re.findall(r"""["']([^"']+)["']""", match[1])
+    packages = _LOAD_PACKAGE.findall(script)
+    for requirement in requirements:
+        # Wheels are named after their package, e.g. panel-1.9.4-py3-...
+        name = requirement.rsplit("/", 1)[-1]
+        if name.endswith(".whl"):
+            packages.append(name.split("-")[0])
+        else:
+            packages.append(re.split(r"[^\w.-]", name)[0])
+    return packages
+
+
+def measure(path: pathlib.Path) -> dict:
+    """Break a page down into inline bytes and the resources it links to."""
+    data = path.read_bytes()
+    inline = {"inline_css": 0, "inline_js": 0, "inline_data": 0}
+    for match in _STYLE.finditer(data):
+        inline["inline_css"] += len(match[1])
+    links = []
+    workers = []
+    for match in _SCRIPT.finditer(data):
+        src = _attribute(match[1], "src")
+        if src is not None:
+            links.append(src)
+        elif b"json" in (_attribute(match[1], "type") or "").encode():
+            inline["inline_data"] += len(match[2])
+        else:
+            inline["inline_js"] += len(match[2])
+        for worker in _WORKER.findall(match[2]):
+            links.append(worker.decode())
+            workers.append(worker.decode())
+    for tag in _LINK.findall(data):
+        rel = (_attribute(tag, "rel") or "").lower()
+        if rel in ("stylesheet", "modulepreload", "icon"):
+            links.append(_attribute(tag, "href"))
+    links += [url.decode() for url in _IMPORTED.findall(data)]
+    return {
+        "html": len(data) - sum(inline.values()),
+        **inline,
+        "links": sorted(set(filter(None, links))),
+        "workers": workers,
+    }
+
+
+class WeightReport:
+    """Page weights of the site, checked against the budgets in geno.yml.
+
+    Pages are only parsed again once their output changed, and linked
+    resources are sized once per build however many pages share them. The
+    packages of Pyodide workers are read every build, as the shared bundle
+    changes without their pages.
+    """
+
+    def __init__(self, state_path: pathlib.Path) -> None:
+        self.state_path = state_path
+        self.state = load_state(state_path, {})
+        self.pages = {}
+
+    def _size(self, url: str, page: pathlib.Path, static: pathlib.Path):
+        url = url.split("?")[0].split("#")[0]
+        if url.startswith(("http://", "https://", "//")):
+            # CDN files of Bokeh and Panel are sized from the installed copy.
+            from .resources import local_file
+
+            local = local_file(url)
+            return local.stat().st_size if local is not None else None
+        path = static / url.lstrip("/") if url.startswith("/") else page.parent / url
+        return path.stat().st_size if path.is_file() else None
+
+    def run(self, pages, static: pathlib.Path) -> dict:
+        """Measure ``pages`` and return the report."""
+        state = {}
+        sizes = {}
+        packages = {}
+        for page in pages:
+            if not page.dst.is_file():
+                continue
+            link = page.link.as_posix()
+            stat = page.dst.stat()
+            key = [stat.st_size, stat.st_mtime_ns]
+            previous = self.state.get(link)
+            # Reports of earlier versions hold packages instead of workers.
+            if previous is not None and previous[0] == key and "workers" in previous[1]:
+                measured = previous[1]
+            else:
+                measured = measure(page.dst)
+            state[link] = [key, measured]
+
+            resources = {}
+            for url in measured["links"]:
+                if url not in sizes:
+                    sizes[url] = self._size(url, page.dst, static)
+                resources[url] = sizes[url]
+            downloads = []
+            for worker in measured["workers"]:
+                path = page.dst.parent / worker
+                if path not in packages:
+                    packages[path] = _packages(path)
+                downloads += packages[path]
+            linked = sum(size for size in resources.values() if size is not None)
+            inline = sum(measured[metric] for metric in METRICS[1:5])
+            self.pages[link] = {
+                "total": inline + linked,
+                **{metric: measured[metric] for metric in METRICS[1:5]},
+                "linked": linked,
+                "resources": resources,
+                "packages": downloads,
+            }
+
+        self.state = state
+        save_state(self.state_path, self.state)
+        return {"pages": dict(sorted(self.pages.items()))}
+
+    def check(self, budgets) -> tuple[list[str], list[str]]:
+        """Compare every page with its budgets; return warnings and errors."""
+        warnings, errors = [], []
+        for budget in budgets:
+            pattern = budget.get("pages", "*")
+            level = errors if budget.get("level", "warn") == "error" else warnings
+            for link, weight in self.pages.items():
+                if not fnmatch.fnmatch(link, pattern):
+                    continue
+                for metric in METRICS:
+                    if metric in budget and weight[metric] > parse_size(budget[metric]):
+                        level.append(
+                            f"{link}: {metric} {_format(weight[metric])} is over "
+                            f"the {_format(parse_size(budget[metric]))} budget"
+                        )
+                if (
+                    "packages" in budget
+                    and len(weight["packages"]) > budget["packages"]
+                ):
+                    level.append(
+                        f"{link}: downloads {len(weight['packages'])} packages, "
+                        f"over the budget of {budget['packages']}"
+                    )
+        return warnings, errors
+
+
+def _format(size: int) -> str:
+    if size >= 1024**2:
+        return f"{size / 1024**2:.1f} MB"
+    return f"{size / 1024:.0f} KB"